@@ -0,0 +1,327 @@
+import io
+import logging
+import os
+import wave
+
+import numpy as np
+
+import resilience
+import tracing
+
+try:
+    import soundfile
+except ImportError:  # FLAC encoding is optional; uploads fall back to WAV
+    soundfile = None
+
+logger = logging.getLogger(__name__)
+
+# Set up audio recording parameters
+FORMAT = 8                # pyaudio.paInt16; PyAudio is only imported to open the microphone
+CHANNELS = 1              # Mono audio
+RATE = 16000              # Sampling rate
+CHUNK = 1024              # Size of each audio chunk
+SAMPLE_WIDTH = 2          # Bytes per int16 sample
+
+TRANSCRIPTION_MODEL = "distil-whisper-large-v3-en"
+
+# Set AUDIO_DEBUG=1 to also dump every utterance to AUDIO_DEBUG_DIR
+DEBUG = os.getenv("AUDIO_DEBUG", "") not in ("", "0", "false", "False")
+DEBUG_DIR = os.getenv("AUDIO_DEBUG_DIR") or os.path.dirname(os.path.abspath(__file__))
+
+# Endpointing defaults (in seconds)
+MIN_SECONDS = 0.5         # Never stop before this much audio
+MAX_SECONDS = 10          # Hard cap on a single utterance
+SILENCE_SECONDS = 0.8     # Trailing silence that ends an utterance
+BUFFER_SECONDS = 60       # Microphone ring buffer; holds the last few utterances
+
+# Pre-upload trimming
+TRIM_WINDOW_SECONDS = 0.02  # RMS window
+TRIM_PAD_SECONDS = 0.15     # Silence kept around the speech so words aren't clipped
+TRIM_MIN_ENERGY = 300.0     # Same floor as EnergyVAD
+TRIM_NOISE_RATIO = 3.0
+
+# Set AUDIO_FLAC=0 to upload WAV even when soundfile is installed
+FLAC = soundfile is not None and os.getenv("AUDIO_FLAC", "1") not in ("", "0", "false", "False")
+
+
+class EnergyVAD:
+    """Energy + zero-crossing voice activity detector over int16 chunks.
+
+    The energy threshold adapts to the room: chunks classified as silence
+    pull a running noise floor, and speech has to be `noise_ratio` times
+    louder than that floor (and never quieter than `min_energy`).
+    """
+
+    def __init__(
+        self,
+        min_energy: float = 300.0,
+        noise_ratio: float = 3.0,
+        zcr_range: tuple = (0.01, 0.5),
+        smoothing: float = 0.9,
+    ):
+        self.min_energy = min_energy
+        self.noise_ratio = noise_ratio
+        self.zcr_range = zcr_range
+        self.smoothing = smoothing
+        self.noise_floor = min_energy / noise_ratio
+
+    def threshold(self) -> float:
+        return max(self.min_energy, self.noise_floor * self.noise_ratio)
+
+    def is_speech(self, chunk) -> bool:
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+        if samples.size < 2:
+            return False
+
+        energy = float(np.sqrt(np.mean(samples * samples)))
+        zcr = float(np.count_nonzero(np.diff(np.signbit(samples)))) / (samples.size - 1)
+
+        speech = energy >= self.threshold() and self.zcr_range[0] <= zcr <= self.zcr_range[1]
+        if not speech:
+            self.noise_floor = self.smoothing * self.noise_floor + (1 - self.smoothing) * energy
+        return speech
+
+
+CHUNK_BYTES = CHUNK * CHANNELS * SAMPLE_WIDTH
+
+
+def seconds_to_bytes(seconds: float) -> int:
+    """Whole chunks' worth of PCM covering `seconds`."""
+    return int(RATE / CHUNK * seconds) * CHUNK_BYTES
+
+
+def capture(
+    stream,
+    buffer: memoryview,
+    min_seconds: float = MIN_SECONDS,
+    max_seconds: float = MAX_SECONDS,
+    silence_seconds: float = SILENCE_SECONDS,
+    vad: EnergyVAD = None,
+) -> int:
+    """Read chunks from an open input stream into `buffer` until the caller stops talking.
+
+    The utterance ends after `silence_seconds` of trailing silence once some
+    speech has been heard, but never before `min_seconds` and never after
+    `max_seconds` (or the end of `buffer`). Returns the number of bytes written.
+    """
+    vad = vad or EnergyVAD()
+    chunks_per_second = RATE / CHUNK
+    min_chunks = int(chunks_per_second * min_seconds)
+    max_chunks = min(int(chunks_per_second * max_seconds), len(buffer) // CHUNK_BYTES)
+    silence_chunks = max(1, int(chunks_per_second * silence_seconds))
+
+    written = 0
+    chunks = 0
+    heard_speech = False
+    trailing_silence = 0
+
+    while chunks < max_chunks:
+        data = stream.read(CHUNK, exception_on_overflow=False)
+        chunk = buffer[written:written + len(data)]
+        chunk[:] = data
+        written += len(data)
+        chunks += 1
+
+        if vad.is_speech(chunk):
+            heard_speech = True
+            trailing_silence = 0
+        else:
+            trailing_silence += 1
+
+        if heard_speech and trailing_silence >= silence_chunks and chunks >= min_chunks:
+            break
+
+    return written
+
+
+class Microphone:
+    """An input stream opened once and reused for every utterance of a session.
+
+    Audio lands in one preallocated ring buffer and each `listen()` returns
+    a memoryview slice of it, so nothing is appended or joined per chunk.
+    A slice stays valid until the ring wraps over it, which with the default
+    buffer is several utterances later; copy it with bytes() to keep it. Between utterances
+    the stream is paused, not closed, so the assistant's own speech is not
+    picked up and the device is not reopened.
+    """
+
+    def __init__(self, buffer_seconds: float = BUFFER_SECONDS, vad: EnergyVAD = None):
+        self._buffer = bytearray(seconds_to_bytes(buffer_seconds))
+        self._view = memoryview(self._buffer)
+        self._position = 0
+        self.vad = vad or EnergyVAD()
+        self._audio = None
+        self._stream = None
+
+    def open(self) -> "Microphone":
+        if self._stream is None:
+            # Needs PortAudio; the service, which only takes uploads, never gets here
+            import pyaudio
+
+            self._audio = pyaudio.PyAudio()
+            self._stream = self._audio.open(format=FORMAT,
+                                            channels=CHANNELS,
+                                            rate=RATE,
+                                            input=True,
+                                            frames_per_buffer=CHUNK,
+                                            start=False)
+        return self
+
+    def listen(
+        self,
+        min_seconds: float = MIN_SECONDS,
+        max_seconds: float = MAX_SECONDS,
+        silence_seconds: float = SILENCE_SECONDS,
+    ) -> memoryview:
+        """Capture one utterance and return it as a slice of the ring buffer."""
+        self.open()
+        # Start over at the front when the longest utterance would not fit
+        if self._position + min(seconds_to_bytes(max_seconds), len(self._buffer)) > len(self._buffer):
+            self._position = 0
+
+        self._stream.start_stream()
+        try:
+            with tracing.span("record") as span:
+                start = self._position
+                written = span.bytes = capture(self._stream, self._view[start:], min_seconds, max_seconds, silence_seconds, self.vad)
+        finally:
+            self._stream.stop_stream()
+
+        self._position = start + written
+        return self._view[start:self._position]
+
+    def close(self) -> None:
+        if self._stream is not None:
+            # Stop and close the stream
+            self._stream.close()
+            self._audio.terminate()
+            self._stream = self._audio = None
+
+    def __enter__(self) -> "Microphone":
+        return self.open()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def to_wav(frames) -> io.BytesIO:
+    """Wrap raw int16 PCM (bytes, a memoryview or a list of chunks) in an in-memory WAV."""
+    if isinstance(frames, (bytes, bytearray, memoryview)):
+        frames = [frames]
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(CHANNELS)
+        wf.setsampwidth(SAMPLE_WIDTH)
+        wf.setframerate(RATE)
+        for chunk in frames:
+            wf.writeframesraw(chunk)
+    buffer.seek(0)
+    return buffer
+
+
+def trim_silence(pcm, window_seconds: float = TRIM_WINDOW_SECONDS, pad_seconds: float = TRIM_PAD_SECONDS) -> memoryview:
+    """Cut leading and trailing silence from int16 PCM.
+
+    RMS is computed over fixed windows in one vectorised pass; the threshold
+    is TRIM_NOISE_RATIO times the quietest fifth of the windows (never below
+    TRIM_MIN_ENERGY). Returns a slice of `pcm` without copying, or all of it
+    if nothing crosses the threshold or even the quietest fifth is louder
+    than TRIM_MIN_ENERGY (speech throughout, e.g. an upload trimmed already).
+    """
+    view = memoryview(pcm).cast("B")
+    samples = np.frombuffer(view, dtype=np.int16)
+    window = max(1, int(RATE * window_seconds))
+    count = samples.size // window
+    if count == 0:
+        return view
+
+    windows = samples[:count * window].astype(np.float32).reshape(count, window)
+    rms = np.sqrt(np.mean(windows * windows, axis=1))
+    floor = float(np.percentile(rms, 20))
+    if floor >= TRIM_MIN_ENERGY:
+        # No silence to cut; a threshold above this floor would land inside the words
+        return view
+    threshold = max(TRIM_MIN_ENERGY, floor * TRIM_NOISE_RATIO)
+    loud = np.flatnonzero(rms >= threshold)
+    if loud.size == 0:
+        return view
+
+    pad = int(RATE * pad_seconds)
+    start = max(0, int(loud[0]) * window - pad)
+    end = min(samples.size, (int(loud[-1]) + 1) * window + pad)
+    return view[start * SAMPLE_WIDTH:end * SAMPLE_WIDTH]
+
+
+def encode(pcm, name: str = "audio.wav"):
+    """Encode int16 PCM for upload: FLAC when available, else WAV.
+
+    Returns the (possibly renamed) file name and an in-memory file.
+    """
+    if not FLAC:
+        return name, to_wav(pcm)
+
+    buffer = io.BytesIO()
+    soundfile.write(buffer, np.frombuffer(pcm, dtype=np.int16), RATE, format="FLAC", subtype="PCM_16")
+    buffer.seek(0)
+    return os.path.splitext(name)[0] + ".flac", buffer
+
+
+def prepare(frames, name: str = "audio.wav"):
+    """Trim and encode captured audio, logging how much the upload shrank."""
+    pcm = frames if isinstance(frames, (bytes, bytearray, memoryview)) else b"".join(frames)
+    with tracing.span("encode", captured=memoryview(pcm).nbytes) as span:
+        trimmed = trim_silence(pcm)
+        name, data = encode(trimmed, name)
+        span.bytes = data.getbuffer().nbytes
+    logger.info(
+        "%s: %d bytes captured, %d after trimming, %d uploaded",
+        name, memoryview(pcm).nbytes, trimmed.nbytes, data.getbuffer().nbytes,
+    )
+    return name, data
+
+
+def transcribe(client, frames, name: str = "audio.wav", debug: bool = None) -> str:
+    """Send captured audio straight to the Groq transcription endpoint.
+
+    Silence is trimmed and the audio FLAC-encoded (when soundfile is
+    installed) before upload. Nothing touches the filesystem unless `debug`
+    (or AUDIO_DEBUG) is set, in which case the untrimmed WAV is also written
+    to DEBUG_DIR under `name`.
+    """
+    if DEBUG if debug is None else debug:
+        with open(os.path.join(DEBUG_DIR, name), "wb") as f:
+            f.write(to_wav(frames).getbuffer())
+
+    return transcribe_file(client, *prepare(frames, name))
+
+
+def transcribe_upload(client, name: str, data: bytes) -> str:
+    """Transcribe an uploaded file, trimming it first if it is 16 kHz mono WAV."""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wf:
+            ours = (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()) == (CHANNELS, SAMPLE_WIDTH, RATE)
+            pcm = wf.readframes(wf.getnframes()) if ours else None
+    except (wave.Error, EOFError):
+        pcm = None
+
+    if pcm is None:
+        # Some other format or rate: upload it as it came
+        return transcribe_file(client, name, data)
+    return transcribe_file(client, *prepare(pcm, name))
+
+
+def transcribe_file(client, name: str, data) -> str:
+    """Transcribe an already encoded file (bytes or file object), e.g. an upload."""
+    # Bytes rather than a file object: retries and hedged duplicates each read it from the start
+    payload = data.getvalue() if hasattr(data, "getvalue") else data
+    with tracing.span("transcribe", bytes=len(payload), model=TRANSCRIPTION_MODEL):
+        transcription = resilience.call(
+            "transcribe",
+            client.audio.transcriptions.create,
+            file=(name, payload),
+            model=TRANSCRIPTION_MODEL,
+            response_format="verbose_json",
+            timeout=resilience.POLICIES["transcribe"].timeout,
+        )
+    return transcription.text
@@ -0,0 +1,137 @@
+"""Offline benchmark for the lab, doctor and doubts flows.
+
+Runs each scenario in benchmark_scenarios.json end to end through
+session.run_local. The microphone plays WAV fixtures, or synthetic
+utterances for turns without one. Groq, Gemini, the llama3 agent, Zoom,
+SMTP, TTS playback and Postgres are replaced by the fakes in fakes.py.
+Reports end-to-end and per-stage p50/p95/p99 latency and calls per
+session, so a change that adds a round trip shows up as a count, not
+just as noise in the timings.
+
+    python benchmark.py --iterations 50 --time-scale 0.1
+    python benchmark.py --only doctor-booking --latency zoom=1.5:4 --no-cache --json out.json
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import redirect_stdout
+
+import numpy as np
+
+import doctor
+import doubts
+import fakes
+import lab
+from session import run_local
+
+FLOWS = {"lab": lab, "doctor": doctor, "doubts": doubts}
+SCENARIOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_scenarios.json")
+PERCENTILES = (50, 95, 99)
+
+
+def percentiles(seconds) -> dict:
+    """p50/p95/p99 in milliseconds."""
+    return {f"p{q}": round(float(np.percentile(seconds, q)) * 1000, 1) for q in PERCENTILES}
+
+
+def run_scenario(name: str, scenario: dict, clients, recorder, iterations: int, fixtures_dir: str) -> dict:
+    module = FLOWS[scenario["flow"]]
+    end_to_end = []
+    stages = defaultdict(list)
+
+    for _ in range(iterations):
+        seen = recorder.calls()
+        fakes.FakePyAudio.script = script = fakes.Script(scenario["turns"], fixtures_dir)
+
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            session = run_local(module.flow, clients)
+        end_to_end.append(time.perf_counter() - start)
+
+        if script.position != len(script.turns):
+            raise RuntimeError(f"{name}: the flow finished after {script.position} of {len(script.turns)} answers")
+        # Mail is sent after the caller hears "booked"; let it land before counting
+        if "mail" in session.slots:
+            session.slots["mail"].result()
+
+        for stage, values in recorder.durations.items():
+            if len(values) > seen.get(stage, 0):
+                stages[stage].extend(values[seen.get(stage, 0):])
+
+    return {
+        "flow": scenario["flow"],
+        "sessions": iterations,
+        "end_to_end": percentiles(end_to_end),
+        "stages": {
+            stage: {"calls_per_session": round(len(values) / iterations, 2), **percentiles(values)}
+            for stage, values in sorted(stages.items())
+        },
+    }
+
+
+def report(results: dict) -> str:
+    lines = []
+    for name, result in results.items():
+        e2e = result["end_to_end"]
+        lines.append(f"{name} ({result['flow']}, {result['sessions']} sessions)")
+        lines.append(f"  {'end-to-end':<14} {'':>8} {e2e['p50']:>9.1f} {e2e['p95']:>9.1f} {e2e['p99']:>9.1f}")
+        lines.append(f"  {'stage':<14} {'calls':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for stage, s in result["stages"].items():
+            lines.append(f"  {stage:<14} {s['calls_per_session']:>8.2f} {s['p50']:>9.1f} {s['p95']:>9.1f} {s['p99']:>9.1f}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scenarios", default=SCENARIOS)
+    parser.add_argument("--only", action="append", help="Scenario name (repeatable)")
+    parser.add_argument("--fixtures", help="Directory the scenarios' wav paths are relative to")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiply every fake latency")
+    parser.add_argument("--latency", action="append", default=[], metavar="STAGE=MEDIAN:P95",
+                        help=f"Override a latency, in seconds; stages: {', '.join(fakes.LATENCY)}")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the LLM and answer caches")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results here")
+    args = parser.parse_args()
+
+    latency = {}
+    for override in args.latency:
+        stage, _, value = override.partition("=")
+        if stage not in fakes.LATENCY:
+            parser.error(f"unknown stage {stage!r}")
+        latency[stage] = fakes.Latency.parse(value)
+
+    with open(args.scenarios) as f:
+        scenarios = json.load(f)
+    if args.only:
+        scenarios = {name: scenarios[name] for name in args.only}
+    fixtures_dir = args.fixtures or os.path.dirname(os.path.abspath(args.scenarios))
+
+    recorder = fakes.Recorder(latency, args.time_scale, args.seed)
+    repo = fakes.SQLiteRepository(recorder)
+    with fakes.installed(recorder, repo):
+        clients = fakes.FakeClients(recorder, repo, caches=not args.no_cache)
+        for module in FLOWS.values():
+            module.warm(clients)
+        try:
+            results = {
+                name: run_scenario(name, scenario, clients, recorder, args.iterations, fixtures_dir)
+                for name, scenario in scenarios.items()
+            }
+        finally:
+            clients.close()
+
+    print(report(results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+# Spoken ways of asking for each test, keyed by the test name in lab_tests
+ALIASES = {
+    "Complete Blood Count Test": ["cbc", "complete blood count", "full blood count", "fbc", "blood count"],
+    "Lipid Profile Test": ["lipid", "lipid panel", "cholesterol", "cholesterol test", "triglycerides"],
+    "Liver Function Test": ["lft", "liver", "liver panel", "liver test"],
+    "Thyroid Profile Test": ["thyroid", "thyroid panel", "thyroid test", "tsh", "t3 t4"],
+    "Vitamin D Test": ["vitamin d", "vit d", "vitamin d3", "vitamin d 3"],
+    "Haemoglobin Test": ["hemoglobin", "haemoglobin", "hb", "hgb"],
+    "Blood Test": ["blood work", "blood checkup"],
+    "Blood Sugar Test": ["sugar", "sugar test", "glucose", "diabetes", "diabetes test", "fasting sugar"],
+    "Blood Pressure Test": ["bp", "bp check", "blood pressure", "hypertension"],
+}
+
+STOPWORDS = {
+    "a", "an", "the", "i", "i'd", "i'm", "me", "my", "to", "for", "of", "do", "is",
+    "want", "wanna", "would", "like", "need", "get", "book", "done", "please",
+    "can", "you", "some", "check", "test", "tests", "lab", "and", "with", "have",
+    "it", "this", "that", "am", "looking",
+}
+
+THRESHOLD = float(os.getenv("LAB_MATCH_THRESHOLD", "0.6"))
+WORD_THRESHOLD = 0.5  # a misheard word still counts as its entry word at this similarity
+
+
+class Match(NamedTuple):
+    name: Optional[str]
+    score: float
+    threshold: float
+
+    @property
+    def ok(self) -> bool:
+        return self.name is not None and self.score >= self.threshold
+
+
+def tokens(text: str) -> List[str]:
+    words = re.findall(r"[a-z0-9']+", str(text).lower())
+    return [w for w in words if w not in STOPWORDS]
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def dice(a: set, b: set) -> float:
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def covered(entry_words: List[str], span: List[str]) -> float:
+    """Share of the entry's words heard in the span, exactly or close enough."""
+    grams = [trigrams(word) for word in span]
+    hits = sum(
+        word in span or any(dice(trigrams(word), other) >= WORD_THRESHOLD for other in grams)
+        for word in entry_words
+    )
+    return hits / len(entry_words)
+
+
+class LabTestCatalog:
+    """Token + character trigram index over test names and their aliases."""
+
+    def __init__(self, names: List[str], aliases: Dict[str, List[str]] = None, threshold: float = THRESHOLD):
+        aliases = ALIASES if aliases is None else aliases
+        self.threshold = threshold
+        self.names = list(dict.fromkeys(names))
+        self.entries = []
+
+        by_key = {name.lower(): name for name in self.names}
+        for name in self.names:
+            phrases = [name] + [a for canon, alist in aliases.items() if canon.lower() == name.lower() for a in alist]
+            for phrase in phrases:
+                words = tokens(phrase)
+                if words:
+                    joined = " ".join(words)
+                    self.entries.append((by_key[name.lower()], words, set(words), trigrams(joined)))
+
+    @classmethod
+    def from_database(cls, **kwargs) -> "LabTestCatalog":
+        import repository
+
+        return cls(repository.lab_test_names(), **kwargs)
+
+    def match(self, query: str, threshold: float = None) -> Match:
+        threshold = self.threshold if threshold is None else threshold
+        words = tokens(query)
+        if not words or not self.entries:
+            return Match(None, 0.0, threshold)
+
+        # Every window of the query the same length as an entry is a candidate span
+        windows = {}
+        best = (0.0, 0, None)
+        for name, entry_words, entry_set, entry_grams in self.entries:
+            size = len(entry_words)
+            if size not in windows:
+                spans = [words[i:i + size] for i in range(max(1, len(words) - size + 1))]
+                windows[size] = [(span, set(span), trigrams(" ".join(span))) for span in spans]
+
+            for span, span_set, span_grams in windows[size]:
+                overlap = len(entry_set & span_set) / len(entry_set)
+                similarity = dice(entry_grams, span_grams)
+                # Exact words count extra, but a misheard word can still win on characters
+                score = max(similarity, 0.4 * overlap + 0.6 * similarity)
+                if size > 1:
+                    # Shared characters alone don't make "vitamin b12" a "vitamin d":
+                    # every word of the entry has to be heard
+                    score = min(score, covered(entry_words, span))
+                # Prefer the more specific entry on ties ("blood sugar" over "blood")
+                if (score, size) > best[:2]:
+                    best = (score, size, name)
+
+        score, _, name = best
+        return Match(name, round(score, 3), threshold)
+
+
+_catalog = None
+
+
+def load() -> LabTestCatalog:
+    """Build the catalog from the lab_tests table once per process."""
+    global _catalog
+    if _catalog is None:
+        _catalog = LabTestCatalog.from_database()
+    return _catalog
@@ -0,0 +1,146 @@
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from catalog import LabTestCatalog
+    from dialogue import Checkpoints
+    from doctor_index import DoctorIndex
+    from llm_cache import CachedModel
+    from outbox import Outbox
+    from prefetch import Speculator
+    from speech import Speaker
+    from zoom import ZoomClient
+
+# Load environment variables
+load_dotenv()
+
+
+class Clients:
+    """API clients, DB-backed indexes and the TTS engine, built once per process.
+
+    The CLI scripts create one of these per run and the service creates one at
+    startup, so every session reuses warm connections instead of paying the
+    configuration cost on each call. Each client is built, and its SDK
+    imported, the first time something uses it: a caller who only hears
+    "Sorry" never loads Zoom or email code.
+    """
+
+    def __init__(self):
+        self._shared = {}
+        self._shared_lock = threading.Lock()
+
+    @cached_property
+    def gemini(self) -> "CachedModel":
+        import google.generativeai as genai
+        from llm_cache import CachedModel
+        from resilience import ResilientModel, groq_json
+
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        model = genai.GenerativeModel(os.getenv("GENAI_MODEL_NAME") or "gemini-2.0-flash")
+        # Deadlines, budgeted retries and hedging; JSON extractions fail over to Groq llama
+        model = ResilientModel(model, failover=groq_json(self.groq))
+        # Repeated prompts (yes/no, specialties, narrations) are answered from disk
+        return CachedModel(model)
+
+    @cached_property
+    def groq(self):
+        from groq import Groq
+
+        # Retries are resilience.call's, under its shared budget
+        return Groq(max_retries=0)
+
+    @cached_property
+    def speaker(self) -> "Speaker":
+        from speech import Speaker
+
+        # Text-to-speech runs on its own thread so flows never block on it
+        return Speaker()
+
+    @cached_property
+    def lab_tests(self) -> "LabTestCatalog":
+        import catalog
+
+        return catalog.load()
+
+    @cached_property
+    def doctor_index(self) -> "DoctorIndex":
+        from doctor_index import DoctorIndex
+
+        return DoctorIndex().start()
+
+    @cached_property
+    def checkpoints(self) -> "Checkpoints":
+        from dialogue import Checkpoints
+
+        return Checkpoints()
+
+    @cached_property
+    def zoom(self) -> "ZoomClient":
+        from zoom import ZoomClient
+
+        return ZoomClient()
+
+    @cached_property
+    def outbox(self) -> "Outbox":
+        from outbox import Outbox
+
+        return Outbox()
+
+    @cached_property
+    def speculator(self) -> "Speculator":
+        from prefetch import Speculator
+
+        return Speculator()
+
+    def preload(self, *names: str) -> None:
+        """Build the named clients now rather than on first use (servers, benchmarks)."""
+        for name in names:
+            getattr(self, name)
+
+    def shared(self, key: str, factory):
+        """Build `factory()` once and hand the same object to every session."""
+        if key not in self._shared:
+            with self._shared_lock:
+                if key not in self._shared:
+                    self._shared[key] = factory()
+        return self._shared[key]
+
+    def speak(self, text: str) -> Future:
+        """Start speaking `text`; returns a Future that resolves when done."""
+        return self.speaker.say(text)
+
+    def synthesize(self, text: str) -> bytes:
+        """Render `text` to WAV bytes for callers that play audio themselves."""
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self.speaker.render(text, path).result()
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def close(self) -> None:
+        if "speaker" in self.__dict__:
+            self.speaker.close()
+        if "gemini" in self.__dict__:
+            self.gemini.cache.close()
+        if "checkpoints" in self.__dict__:
+            self.checkpoints.close()
+        if "zoom" in self.__dict__:
+            self.zoom.close()
+        if "outbox" in self.__dict__:
+            self.outbox.close()
+        if "speculator" in self.__dict__:
+            self.speculator.close()
+        # Only opened if a flow queried the database
+        if "repository" in sys.modules:
+            sys.modules["repository"].close_pool()
+
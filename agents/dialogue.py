@@ -0,0 +1,214 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Union
+
+import parsing
+import tracing
+from session import Listen
+
+PATH = os.getenv("CHECKPOINT_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints.sqlite3")
+MAX_AGE = float(os.getenv("CHECKPOINT_MAX_AGE", str(24 * 3600)))  # seconds an abandoned call stays resumable
+MAX_ATTEMPTS = int(os.getenv("DIALOGUE_ATTEMPTS", "3"))  # tries per slot before giving up
+
+RESUMED = "Welcome back. Let's pick up where we left off."
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    session_id TEXT PRIMARY KEY,
+    flow TEXT NOT NULL,
+    slots BLOB NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class Stop(Exception):
+    """Raised by a step to end the dialogue; `message` is said first."""
+
+    def __init__(self, message: str = None):
+        super().__init__(message)
+        self.message = message
+
+
+class GiveUp(Stop):
+    """Like Stop, but the checkpoint is kept so the caller can resume later."""
+
+
+class Ask(NamedTuple):
+    """Prompt for a slot and parse the answer, re-asking only this slot on failure.
+
+    `parse(session, text)` returns the slot's value, or None when it could
+    not make sense of the answer. `prompt` may be a callable taking the
+    slots filled so far.
+    """
+
+    slot: str
+    prompt: Union[str, Callable[[dict], str]]
+    parse: Callable[[Any, str], Any]
+    listen: Listen
+    retry: str = "Sorry, I didn't catch that. Could you say it again?"
+    give_up: str = "Sorry, I couldn't understand. Try again after some time."
+    attempts: int = MAX_ATTEMPTS
+
+
+class Do(NamedTuple):
+    """Compute a slot from the ones before it: a lookup, a narration, a booking.
+
+    Durable results are checkpointed and never redone on resume; set
+    `durable=False` for live objects (Futures, speculative work) that are
+    cheap to redo and can't be stored.
+    """
+
+    slot: str
+    action: Callable[[Any], Any]
+    durable: bool = True
+
+
+Step = Union[Ask, Do]
+
+
+class Checkpoint(NamedTuple):
+    flow: str
+    slots: Dict[str, Any]
+    updated: float
+
+
+class Checkpoints:
+    """Filled slots per session in SQLite, so an abandoned call can be resumed.
+
+    Values are pickled (they include NamedTuples such as LabTest and Meeting,
+    and datetimes); the file is local and written only by this process.
+    """
+
+    def __init__(self, path: str = PATH, max_age: float = MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.saved = 0
+        self.resumed = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def load(self, session_id: str, flow: str) -> Optional[Checkpoint]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT flow, slots, updated FROM checkpoints WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None or row[0] != flow or time.time() - row[2] > self.max_age:
+            return None
+        self.resumed += 1
+        return Checkpoint(row[0], pickle.loads(row[1]), row[2])
+
+    def save(self, session_id: str, flow: str, slots: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints (session_id, flow, slots, updated) VALUES (?, ?, ?, ?)",
+                (session_id, flow, pickle.dumps(slots), now),
+            )
+            self._db.execute("DELETE FROM checkpoints WHERE updated < ?", (now - self.max_age,))
+            self.saved += 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM checkpoints WHERE session_id = ?", (session_id,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            (pending,) = self._db.execute("SELECT count(*) FROM checkpoints").fetchone()
+        return {"pending": pending, "saved": self.saved, "resumed": self.resumed}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def phrases(steps: Sequence[Step]) -> tuple:
+    """Every fixed line `steps` can say, for the speaker to render up front."""
+    lines = [RESUMED]
+    for step in steps:
+        if isinstance(step, Ask):
+            lines += [text for text in (step.prompt, step.retry, step.give_up) if isinstance(text, str)]
+    return tuple(dict.fromkeys(lines))
+
+
+# Slot parsers shared by the booking flows
+
+def yes_no(session, text: str):
+    ans = parsing.confirm(session.clients.gemini, text)
+    print(f"Confirmation ({ans.source}): ", ans.value)
+    return ans.value
+
+
+def caller_name(session, text: str):
+    return parsing.name(session.clients.gemini, text).value or None
+
+
+def booking_date(session, text: str):
+    # "10 May 8 AM" fills the time slot as well; only what's missing is asked again.
+    # The latest time heard wins: a retry of the date may also correct the time
+    day, hour = parsing.booking_parts(session.clients.gemini, text)
+    if hour.value is not None:
+        session.slots["time"] = hour.value
+    print(f"Date Transcribed ({day.source}): ", day.value and parsing.format_date(day.value))
+    return day.value
+
+
+def booking_hour(session, text: str):
+    hour = parsing.time_of_day(session.clients.gemini, text)
+    print(f"Time Transcribed ({hour.source}): ", hour.value and parsing.format_time(hour.value))
+    return hour.value
+
+
+def run(session, steps: Sequence[Step]):
+    """Drive `steps` as a flow: `return (yield from dialogue.run(session, STEPS))`.
+
+    Steps whose slot is already filled are skipped, so a session started
+    with the ID of an abandoned one carries on from its first missing slot
+    instead of repeating every lookup and LLM call before it. A step may
+    fill later slots too (a "10 May 8 AM" answer fills date and time).
+    """
+    store = session.clients.checkpoints
+    slots = session.slots
+    durable = [step.slot for step in steps if not isinstance(step, Do) or step.durable]
+
+    checkpoint = store.load(session.id, session.flow_name)
+    if checkpoint is not None:
+        slots.update(checkpoint.slots)
+        session.say(RESUMED)
+
+    try:
+        for step in steps:
+            if step.slot in slots:
+                continue
+            if isinstance(step, Ask):
+                slots[step.slot] = yield from _ask(session, step)
+            else:
+                slots[step.slot] = step.action(session)
+            if step.slot in durable:
+                store.save(session.id, session.flow_name, {k: slots[k] for k in durable if k in slots})
+    except GiveUp as stop:
+        if stop.message:
+            session.say(stop.message)
+        return
+    except Stop as stop:
+        if stop.message:
+            session.say(stop.message)
+    store.delete(session.id)
+
+
+def _ask(session, step: Ask):
+    prompt = step.prompt(session.slots) if callable(step.prompt) else step.prompt
+    for attempt in range(1, step.attempts + 1):
+        session.say(prompt if attempt == 1 else step.retry)
+        answer = yield step.listen
+        with tracing.span("slot", attempt=attempt, slot=step.slot) as span:
+            value = step.parse(session, answer)
+            span.attrs["filled"] = value is not None
+        if value is not None:
+            return value
+    raise GiveUp(step.give_up)
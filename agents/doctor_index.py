@@ -0,0 +1,160 @@
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+import repository
+from repository import Doctor
+
+# Everyday ways of asking for a specialist, keyed by canonical specialisation
+SYNONYMS = {
+    "cardiologist": ["heart", "heart doctor", "heart specialist", "cardiology", "cardiac", "chest pain", "blood pressure"],
+    "dermatologist": ["skin", "skin doctor", "skin specialist", "dermatology", "rash", "acne", "hair fall"],
+    "neurologist": ["brain", "nerve", "nerves", "neurology", "migraine", "seizure"],
+    "orthopedist": ["bone", "bones", "joint", "joints", "fracture", "ortho", "orthopedic", "orthopaedic", "back pain"],
+    "pediatrician": ["child", "children", "kid", "kids", "baby", "paediatrician", "child specialist"],
+    "gynecologist": ["gynaecologist", "gynae", "pregnancy", "women's health", "obstetrician"],
+    "ophthalmologist": ["eye", "eyes", "eye doctor", "eye specialist", "vision"],
+    "ent specialist": ["ent", "ear", "nose", "throat", "ear nose throat"],
+    "psychiatrist": ["mental health", "depression", "anxiety", "psychiatry", "stress"],
+    "dentist": ["tooth", "teeth", "dental", "toothache"],
+    "gastroenterologist": ["stomach", "digestion", "gastro", "acidity", "stomach ache"],
+    "pulmonologist": ["lung", "lungs", "breathing", "asthma", "chest specialist"],
+    "endocrinologist": ["diabetes", "thyroid", "hormone", "hormones", "sugar"],
+    "urologist": ["kidney", "urine", "bladder", "urinary"],
+    "general physician": ["general physician", "physician", "gp", "family doctor", "fever", "cold", "cough"],
+}
+
+TTL_SECONDS = float(os.getenv("DOCTOR_INDEX_TTL", "300"))
+
+
+def normalise(text: str) -> str:
+    words = re.findall(r"[a-z']+", str(text).lower())
+    # "cardiologists" -> "cardiologist"
+    words = [w[:-1] if len(w) > 4 and w.endswith("s") and not w.endswith("ss") else w for w in words]
+    return " ".join(words)
+
+
+class DoctorIndex:
+    """In-memory doctors-by-specialisation catalog with a TTL background refresh."""
+
+    def __init__(self, loader=repository.all_doctors, ttl: float = TTL_SECONDS, synonyms: Dict[str, List[str]] = None):
+        self.loader = loader
+        self.ttl = ttl
+        self.synonyms = SYNONYMS if synonyms is None else synonyms
+
+        self.by_specialisation: Dict[str, List[Doctor]] = {}
+        self.phrases: Dict[str, str] = {}
+        self.loaded_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.last_refresh_seconds = 0.0
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def refresh(self) -> None:
+        started = time.perf_counter()
+        try:
+            doctors = self.loader()
+        except Exception:
+            self.refresh_errors += 1
+            raise
+
+        by_specialisation: Dict[str, List[Doctor]] = {}
+        for doctor in doctors:
+            by_specialisation.setdefault(normalise(doctor.specialisation), []).append(doctor)
+
+        # Phrase -> canonical specialisation, longest phrases matched first
+        phrases = {key: key for key in by_specialisation}
+        for canonical, words in self.synonyms.items():
+            group = [normalise(canonical)] + [normalise(w) for w in words]
+            # The table may store "Cardiology" rather than "Cardiologist"
+            key = next((g for g in group if g in by_specialisation), None)
+            if key is not None:
+                for phrase in group:
+                    phrases.setdefault(phrase, key)
+
+        with self._lock:
+            self.by_specialisation = by_specialisation
+            self.phrases = dict(sorted(phrases.items(), key=lambda item: -len(item[0])))
+            self.loaded_at = time.monotonic()
+            self.refreshes += 1
+            self.last_refresh_seconds = time.perf_counter() - started
+
+    def start(self) -> "DoctorIndex":
+        """Load now and keep refreshing every `ttl` seconds on a daemon thread."""
+        if not self.loaded_at:
+            self.refresh()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="doctor-index", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.ttl)
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception:
+                pass  # keep serving the last good snapshot; counted in refresh_errors
+
+    def invalidate(self) -> None:
+        """Rebuild the index in the background without blocking callers."""
+        if self._thread is None:
+            self.start()
+        else:
+            self._wake.set()
+
+    def _ensure_loaded(self) -> None:
+        if not self.loaded_at:
+            self.refresh()
+        elif self._thread is None and time.monotonic() - self.loaded_at > self.ttl:
+            self.invalidate()
+
+    def resolve(self, text: str) -> Optional[str]:
+        """Map "heart doctor" / "a skin specialist" to a canonical specialisation."""
+        self._ensure_loaded()
+        padded = f" {normalise(text)} "
+        with self._lock:
+            phrases = self.phrases
+        for phrase, key in phrases.items():
+            if f" {phrase} " in padded:
+                return key
+        return None
+
+    def doctors(self, specialty: str) -> List[Doctor]:
+        self._ensure_loaded()
+        key = normalise(specialty)
+        with self._lock:
+            found = self.by_specialisation.get(key)
+        if found is None:
+            resolved = self.resolve(specialty)
+            with self._lock:
+                found = self.by_specialisation.get(resolved) if resolved else None
+
+        if found is not None:
+            self.hits += 1
+            return list(found)
+
+        self.misses += 1
+        return repository.find_doctors(specialty)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "age_seconds": time.monotonic() - self.loaded_at if self.loaded_at else None,
+            "specialisations": len(self.by_specialisation),
+        }
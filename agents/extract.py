@@ -0,0 +1,61 @@
+import json
+from typing import Optional, Type, TypeVar
+
+from pydantic import BaseModel, Field, ValidationError
+
+Record = TypeVar("Record", bound=BaseModel)
+
+
+class ExtractionError(ValueError):
+    pass
+
+
+# Records pulled out of transcripts.
+# Every field is optional: the model returns null for anything it can't find.
+
+class BookingSlot(BaseModel):
+    date: Optional[str] = Field(None, description="Date the user is looking for (ex: March 26)")
+    time: Optional[str] = Field(None, description="Time the user is looking for (ex: 8 A.M)")
+
+
+def build_prompt(text: str, schema: Type[BaseModel]) -> str:
+    fields = "\n".join(
+        f'- "{name}": {field.description or name}'
+        for name, field in schema.model_fields.items()
+    )
+    return f"""Extract the following fields from the text below and return a single JSON object with exactly these keys:
+{fields}
+
+Use null for any field that is not present in the text. Don't add any other keys or words.
+
+Text:
+\"\"\"{text}\"\"\""""
+
+
+def parse(raw: str, schema: Type[Record]) -> Record:
+    raw = raw.strip()
+    # Tolerate a fenced ```json block in case the model ignores JSON mode
+    if raw.startswith("```"):
+        raw = raw.strip("`")
+        raw = raw[raw.find("{"):]
+
+    try:
+        data = json.loads(raw)
+        if isinstance(data, list) and data:
+            data = data[0]
+        # Normalise empty strings and placeholder zeros to missing values
+        if isinstance(data, dict):
+            data = {k: (None if v in ("", "0", "null", "None") else v) for k, v in data.items()}
+        return schema.model_validate(data)
+    except (json.JSONDecodeError, ValidationError) as e:
+        raise ExtractionError(f"Could not extract {schema.__name__} from model output: {raw!r}") from e
+
+
+def extract(model, text, schema: Type[Record], kind: str = None) -> Record:
+    """Fill every field of `schema` from `text` with a single JSON-mode call."""
+    response = model.generate_content(
+        build_prompt(str(text), schema),
+        kind=kind,
+        generation_config={"response_mime_type": "application/json"},
+    )
+    return parse(response.text, schema)
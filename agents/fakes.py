@@ -0,0 +1,496 @@
+"""Local stand-ins for every external backend, for the offline benchmark.
+
+Each fake sleeps for a latency drawn from a configurable distribution and
+records the call in a Recorder, so a benchmark run reports how many round
+trips each flow makes and where the time goes. Nothing here opens a
+socket, a microphone or a speaker.
+"""
+
+import functools
+import io
+import json
+import math
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+import audio
+import catalog
+import repository
+from clients import Clients
+from dialogue import Checkpoints
+from doctor_index import DoctorIndex
+from llm_cache import CachedModel, ResponseCache
+from outbox import Mail
+from prefetch import Speculator
+from repository import Doctor, LabTest
+from semantic_cache import SemanticCache
+from zoom import Meeting
+
+
+class Latency(NamedTuple):
+    """Log-normal latency given by its median and 95th percentile, in seconds."""
+
+    median: float
+    p95: float
+
+    @classmethod
+    def parse(cls, text: str) -> "Latency":
+        """Read "0.4:1.2" (median:p95); a single number means no spread."""
+        median, _, p95 = text.partition(":")
+        return cls(float(median), float(p95 or median))
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        sigma = math.log(self.p95 / self.median) / 1.645 if self.p95 > self.median else 0.0
+        return self.median * math.exp(sigma * rng.gauss(0, 1))
+
+
+# Rough production figures; override per run with --latency stage=median:p95
+LATENCY = {
+    "transcribe": Latency(0.35, 0.9),
+    "gemini": Latency(0.6, 1.6),
+    "gemini_chunk": Latency(0.05, 0.15),  # per streamed chunk after the first
+    "agent": Latency(2.5, 6.0),  # llama3 agent run including its web search
+    "db": Latency(0.004, 0.02),
+    "zoom_token": Latency(0.3, 0.8),
+    "zoom": Latency(0.4, 1.0),
+    "smtp_login": Latency(0.6, 1.5),
+    "smtp": Latency(0.3, 0.8),
+    "tts_word": Latency(0.33, 0.4),  # playback per spoken word at 180 wpm
+}
+
+
+class Recorder:
+    """Per-stage call counts, latencies and payload bytes, safe across threads."""
+
+    def __init__(self, latency: Dict[str, Latency] = None, time_scale: float = 1.0, seed: int = None):
+        self.latency = {**LATENCY, **(latency or {})}
+        self.time_scale = time_scale
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self.payload: Dict[str, int] = defaultdict(int)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, stage: str, times: float = 1) -> float:
+        with self._lock:
+            seconds = self.latency[stage].sample(self._rng) * times * self.time_scale
+        time.sleep(seconds)
+        return seconds
+
+    def record(self, stage: str, seconds: float, payload: int = 0) -> None:
+        with self._lock:
+            self.durations[stage].append(seconds)
+            self.payload[stage] += payload
+
+    @contextmanager
+    def timed(self, stage: str, payload: int = 0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, payload)
+
+    def calls(self) -> Dict[str, int]:
+        with self._lock:
+            return {stage: len(values) for stage, values in self.durations.items()}
+
+
+# Microphone -------------------------------------------------------------------
+
+
+def load_wav(path: str) -> bytes:
+    with wave.open(path, "rb") as wf:
+        if (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()) != (audio.CHANNELS, audio.SAMPLE_WIDTH, audio.RATE):
+            raise ValueError(f"{path}: fixtures must be 16 kHz mono int16 WAV")
+        return wf.readframes(wf.getnframes())
+
+
+def synthesize_utterance(text: str, seed: int = 0) -> bytes:
+    """Voiced tone bursts, one per word, that the VAD and trimmer treat as speech."""
+    rng = np.random.default_rng(seed)
+    pieces = [rng.normal(0, 40, int(audio.RATE * 0.3))]
+    for i, _ in enumerate(text.split()):
+        t = np.arange(int(audio.RATE * 0.28)) / audio.RATE
+        pitch = 140 + 40 * ((i * 7) % 5)
+        pieces.append(6000 * np.sin(2 * np.pi * pitch * t) * np.hanning(t.size))
+        pieces.append(rng.normal(0, 40, int(audio.RATE * 0.06)))
+    return np.concatenate(pieces).astype(np.int16).tobytes()
+
+
+class Script:
+    """The answers a simulated caller gives, in order: audio plus its transcript."""
+
+    def __init__(self, turns: List[dict], fixtures_dir: str = "."):
+        self.turns = []
+        for i, turn in enumerate(turns):
+            turn = {"text": turn} if isinstance(turn, str) else turn
+            path = turn.get("wav")
+            pcm = load_wav(f"{fixtures_dir}/{path}") if path else synthesize_utterance(turn["text"], seed=i)
+            self.turns.append((pcm, turn["text"]))
+        self.position = 0
+        self.transcript: Optional[str] = None
+
+    def next_utterance(self) -> bytes:
+        if self.position >= len(self.turns):
+            raise RuntimeError("The flow asked for more answers than the scenario has")
+        pcm, self.transcript = self.turns[self.position]
+        self.position += 1
+        return pcm
+
+
+class FakeStream:
+    """PyAudio input stream that plays the script's next utterance, then room noise."""
+
+    def __init__(self, script: Script):
+        self.script = script
+        self.pcm = b""
+        self.offset = 0
+        self._noise = (np.random.default_rng(0).normal(0, 40, audio.CHUNK).astype(np.int16)).tobytes()
+
+    def start_stream(self) -> None:
+        self.pcm, self.offset = self.script.next_utterance(), 0
+
+    def read(self, frames: int, exception_on_overflow: bool = True) -> bytes:
+        size = frames * audio.SAMPLE_WIDTH
+        chunk = self.pcm[self.offset:self.offset + size]
+        self.offset += size
+        return chunk + self._noise[:size - len(chunk)] if len(chunk) < size else chunk
+
+    def stop_stream(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class FakePyAudio:
+    script: Script = None  # set by the benchmark before each session
+
+    def open(self, **kwargs) -> FakeStream:
+        return FakeStream(FakePyAudio.script)
+
+    def terminate(self) -> None:
+        pass
+
+
+# Model and API backends ---------------------------------------------------------
+
+
+class FakeGroq:
+    """Groq client whose transcriptions return the script's current transcript."""
+
+    def __init__(self, recorder: Recorder, script_source):
+        self.recorder = recorder
+        self.script_source = script_source
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._transcribe))
+
+    def _transcribe(self, file, model, response_format=None, **kwargs):
+        name, data = file
+        size = len(data.getbuffer()) if isinstance(data, io.BytesIO) else len(data)
+        with self.recorder.timed("transcribe", payload=size):
+            self.recorder.delay("transcribe")
+        return SimpleNamespace(text=self.script_source().transcript)
+
+
+NARRATION = (
+    "According to us, this test is offered at an affordable price. It measures what your doctor needs to know. "
+    "It needs no special preparation in most cases. Let me know if you want to book this test."
+)
+
+
+class FakeGemini:
+    model_name = "models/fake-gemini"
+
+    def __init__(self, recorder: Recorder):
+        self.recorder = recorder
+
+    def _answer(self, prompt: str, generation_config) -> str:
+        lower = prompt.lower()
+        if generation_config:
+            return json.dumps({"date": None, "time": None})
+        if "specialist" in lower:
+            return "Cardiologist"
+        if "yes or no" in lower:
+            return "Yes"
+        if "fetch just the name" in lower:
+            return "Asha"
+        return NARRATION
+
+    def generate_content(self, contents, stream: bool = False, generation_config=None, **kwargs):
+        text = self._answer(str(contents), generation_config)
+        if not stream:
+            with self.recorder.timed("gemini", payload=len(str(contents))):
+                self.recorder.delay("gemini")
+            return SimpleNamespace(text=text)
+        return self._stream(str(contents), text)
+
+    def _stream(self, prompt: str, text: str):
+        start = time.perf_counter()
+        self.recorder.delay("gemini")
+        words = text.split(" ")
+        for i in range(0, len(words), 6):
+            if i:
+                self.recorder.delay("gemini_chunk")
+            yield SimpleNamespace(text=" ".join(words[i:i + 6]) + " ")
+        self.recorder.record("gemini", time.perf_counter() - start, len(prompt))
+
+
+class FakeAgent:
+    """Replaces the phi llama3 Agent in doubts.py; one run = search + completion."""
+
+    recorder: Recorder = None
+
+    def __init__(self, **kwargs):
+        pass
+
+    def run(self, message: str):
+        with self.recorder.timed("agent", payload=len(message)):
+            self.recorder.delay("agent")
+        return "Paracetamol relieves pain and fever. Overdose can damage the liver."
+
+
+class FakeZoom:
+    def __init__(self, recorder: Recorder):
+        self.recorder = recorder
+        self._token = None
+        self._lock = threading.Lock()
+
+    def access_token(self) -> str:
+        with self._lock:
+            if self._token is None:
+                with self.recorder.timed("zoom_token"):
+                    self.recorder.delay("zoom_token")
+                self._token = "token"
+        return self._token
+
+    def create_meeting(self, topic: str, start, duration: int = 30) -> Meeting:
+        self.access_token()
+        with self.recorder.timed("zoom"):
+            self.recorder.delay("zoom")
+        return Meeting("81234567890", "https://zoom.us/j/81234567890", topic, start.isoformat(), duration)
+
+    def close(self) -> None:
+        pass
+
+
+class FakeOutbox:
+    """One worker thread and one login, like outbox.Outbox."""
+
+    def __init__(self, recorder: Recorder):
+        self.recorder = recorder
+        self.logged_in = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fake-outbox")
+
+    def _login(self) -> bool:
+        if not self.logged_in:
+            with self.recorder.timed("smtp_login"):
+                self.recorder.delay("smtp_login")
+            self.logged_in = True
+        return True
+
+    def _send(self, mail: Mail) -> int:
+        self._login()
+        with self.recorder.timed("smtp", payload=len(mail.body)):
+            self.recorder.delay("smtp")
+        return 1
+
+    def connect(self) -> Future:
+        return self._executor.submit(self._login)
+
+    def send(self, mail: Mail) -> Future:
+        return self._executor.submit(self._send, mail)
+
+    def stats(self) -> dict:
+        return {}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+class FakeSpeaker:
+    """Queues utterances on one thread and 'plays' them for their spoken length."""
+
+    def __init__(self, recorder: Recorder):
+        self.recorder = recorder
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fake-speaker")
+        self._last: Optional[Future] = None
+
+    def _play(self, text: str) -> None:
+        with self.recorder.timed("tts"):
+            self.recorder.delay("tts_word", times=len(text.split()))
+
+    def say(self, text: str) -> Future:
+        self._last = self._executor.submit(self._play, text)
+        return self._last
+
+    def prerender(self, phrases=(), prefixes=()) -> Future:
+        future = Future()
+        future.set_result(0)
+        return future
+
+    def wait(self, timeout: float = None) -> None:
+        if self._last is not None:
+            self._last.result(timeout)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+# Database -------------------------------------------------------------------------
+
+LAB_TESTS = [
+    LabTest("Blood Sugar Test", "CityCare Labs", 150, "Measures the glucose level in your blood.", "citycare@example.com"),
+    LabTest("Blood Sugar Test", "Sunrise Diagnostics", 200, "Fasting and post-meal glucose.", "sunrise@example.com"),
+    LabTest("Thyroid Profile Test", "CityCare Labs", 450, "T3, T4 and TSH levels.", "citycare@example.com"),
+    LabTest("Complete Blood Count", "Sunrise Diagnostics", 300, "Red cells, white cells and platelets.", "sunrise@example.com"),
+    LabTest("Lipid Profile", "CityCare Labs", 500, "Cholesterol and triglycerides.", "citycare@example.com"),
+]
+
+DOCTORS = [
+    Doctor("Dr. Meera Rao", "meera.rao@example.com", "Cardiologist"),
+    Doctor("Dr. Arjun Sen", "arjun.sen@example.com", "Cardiologist"),
+    Doctor("Dr. Kavya Iyer", "kavya.iyer@example.com", "Dermatologist"),
+    Doctor("Dr. Rohan Das", "rohan.das@example.com", "Neurologist"),
+]
+
+
+class SQLiteRepository:
+    """A throwaway SQLite copy of the lab_tests and doctors tables.
+
+    Exposes the same query functions as the repository module (which `install()`
+    swaps in), so the flows, catalog and doctor index run unchanged.
+    """
+
+    def __init__(self, recorder: Recorder, lab_tests: List[LabTest] = LAB_TESTS, doctors: List[Doctor] = DOCTORS):
+        self.recorder = recorder
+        self.db = sqlite3.connect(":memory:", check_same_thread=False)
+        self.db.execute('CREATE TABLE lab_tests (name TEXT, "labName" TEXT, price NUMERIC, description TEXT, contact TEXT)')
+        self.db.execute("CREATE TABLE doctors (name TEXT, email TEXT, specialisation TEXT)")
+        self.db.executemany("INSERT INTO lab_tests VALUES (?, ?, ?, ?, ?)", lab_tests)
+        self.db.executemany("INSERT INTO doctors VALUES (?, ?, ?)", doctors)
+        self._lock = threading.Lock()
+
+    def _query(self, sql: str, *params) -> list:
+        with self.recorder.timed("db"):
+            self.recorder.delay("db")
+            with self._lock:
+                return self.db.execute(sql, params).fetchall()
+
+    def lab_test_names(self) -> List[str]:
+        return [row[0] for row in self._query("SELECT DISTINCT name FROM lab_tests ORDER BY name")]
+
+    def find_lab_tests(self, name: str) -> List[LabTest]:
+        rows = self._query(
+            'SELECT name, "labName", price, description, contact FROM lab_tests WHERE lower(name) = lower(?) ORDER BY price',
+            name,
+        )
+        return [LabTest(*row) for row in rows]
+
+    def find_doctors(self, specialisation: str) -> List[Doctor]:
+        rows = self._query(
+            "SELECT name, email, specialisation FROM doctors WHERE specialisation LIKE '%' || ? || '%' ORDER BY name",
+            specialisation,
+        )
+        return [Doctor(*row) for row in rows]
+
+    def all_doctors(self) -> List[Doctor]:
+        return [Doctor(*row) for row in self._query("SELECT name, email, specialisation FROM doctors ORDER BY specialisation, name")]
+
+
+# Wiring ---------------------------------------------------------------------------------
+
+
+class FakeClients(Clients):
+    """Clients wired to the fakes above; caches live in a temporary directory."""
+
+    def __init__(self, recorder: Recorder, repo: SQLiteRepository, caches: bool = True):
+        self.recorder = recorder
+        self._tmp = tempfile.TemporaryDirectory(prefix="medicare-bench-")
+
+        # caches=False measures every round trip: nothing is ever fresh enough to hit
+        cache = ResponseCache(f"{self._tmp.name}/llm.sqlite3", **({} if caches else {"max_age": 0}))
+        answers = SemanticCache(f"{self._tmp.name}/answers.sqlite3", **({} if caches else {"threshold": 2.0}))
+        self.gemini = CachedModel(FakeGemini(recorder), cache)
+        self.groq = FakeGroq(recorder, lambda: FakePyAudio.script)
+        self.speaker = FakeSpeaker(recorder)
+
+        self._shared = {
+            "duckduckgo": None,  # the fake agent never calls its tools
+            "answers": answers,
+        }
+        self._shared_lock = threading.Lock()
+
+        # Fill the cached properties so nothing real is ever built
+        self.__dict__.update(
+            lab_tests=catalog.LabTestCatalog(repo.lab_test_names()),
+            checkpoints=Checkpoints(f"{self._tmp.name}/checkpoints.sqlite3"),
+            doctor_index=DoctorIndex(loader=repo.all_doctors),
+            zoom=FakeZoom(recorder),
+            outbox=FakeOutbox(recorder),
+            speculator=Speculator(),
+        )
+
+    def close(self) -> None:
+        self.speaker.close()
+        self.outbox.close()
+        self.speculator.close()
+        self.gemini.cache.close()
+        self.checkpoints.close()
+        self._shared["answers"].close()
+        self._tmp.cleanup()
+
+
+@contextmanager
+def installed(recorder: Recorder, repo: SQLiteRepository):
+    """Swap the module-level backends the flows reach directly, then restore them."""
+    # doubts.py imports the agent class on a cache miss, so patch it at the source
+    import phi.agent
+
+    def timed(stage, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with recorder.timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    patches = [
+        # Local work worth timing: capture from the (fake) microphone, trim + encode
+        (audio.Microphone, "listen", timed("record", audio.Microphone.listen)),
+        (audio, "prepare", timed("encode", audio.prepare)),
+        (phi.agent, "Agent", FakeAgent),
+        (repository, "lab_test_names", repo.lab_test_names),
+        (repository, "find_lab_tests", repo.find_lab_tests),
+        (repository, "find_doctors", repo.find_doctors),
+        (repository, "all_doctors", repo.all_doctors),
+    ]
+    # The microphone imports PyAudio when it opens, so the fake has to be the module itself
+    modules = {"pyaudio": SimpleNamespace(PyAudio=FakePyAudio, paInt16=audio.FORMAT)}
+    saved = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    saved_modules = {name: sys.modules.get(name) for name in modules}
+    FakeAgent.recorder = recorder
+    for module, name, value in patches:
+        setattr(module, name, value)
+    sys.modules.update(modules)
+    try:
+        yield
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
+        for name, module in saved_modules.items():
+            if module is None:
+                del sys.modules[name]
+            else:
+                sys.modules[name] = module
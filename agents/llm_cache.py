@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, NamedTuple, Optional
+
+import tracing
+
+PATH = os.getenv("LLM_CACHE_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+MAX_AGE = float(os.getenv("LLM_CACHE_MAX_AGE", str(30 * 24 * 3600)))  # seconds
+EVICT_EVERY = 100  # writes between eviction passes
+
+# Seconds an answer stays valid, by prompt kind; 0 disables caching for that kind.
+# Unlisted kinds fall back to MAX_AGE.
+TTLS: Dict[str, float] = {
+    "confirm": MAX_AGE,
+    "specialty": MAX_AGE,
+    "booking": 7 * 24 * 3600,
+    "narration": 24 * 3600,  # prices and descriptions can change
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    kind TEXT,
+    text TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+class CachedResponse(NamedTuple):
+    """Stands in for a GenerateContentResponse (or one streamed chunk)."""
+
+    text: str
+
+
+def usage_tokens(response) -> int:
+    """Total tokens Gemini reports for a response or streamed chunk; 0 if unknown."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", 0) or 0
+
+
+def normalise(prompt) -> str:
+    return re.sub(r"\s+", " ", str(prompt)).strip().casefold()
+
+
+class ResponseCache:
+    """SQLite-backed LRU of model answers, evicted by count and by age."""
+
+    def __init__(self, path: str = PATH, max_entries: int = MAX_ENTRIES, max_age: float = MAX_AGE, ttls: Dict[str, float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.ttls = dict(TTLS if ttls is None else ttls)
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def ttl(self, kind: Optional[str]) -> float:
+        return min(self.ttls.get(kind, self.max_age), self.max_age)
+
+    @staticmethod
+    def key(model: str, prompt, config=None) -> str:
+        parts = [model, normalise(prompt), json.dumps(config, sort_keys=True, default=str)]
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    def get(self, key: str, kind: Optional[str] = None) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT text, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl(kind):
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, kind: Optional[str], text: str) -> None:
+        if self.ttl(kind) <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, kind, text, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, kind, text, now, now),
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def evict(self) -> None:
+        with self._lock:
+            self._evict(time.time())
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._db.execute("SELECT count(*) FROM responses").fetchone()
+        return {"entries": entries, "hits": self.hits, "misses": self.misses, "hit_ratio": round(self.hit_ratio(), 3)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class CachedModel:
+    """Wraps a GenerativeModel so repeated prompts are answered from disk.
+
+    `generate_content(prompt, kind=...)` takes the same arguments as the
+    wrapped model plus an optional prompt kind that selects the TTL. Streamed
+    calls are cached too: a miss passes chunks through as they arrive and
+    stores the joined text at the end; a hit yields it as a single chunk.
+    """
+
+    def __init__(self, model, cache: ResponseCache = None):
+        self.model = model
+        self.model_name = getattr(model, "model_name", type(model).__name__)
+        self.cache = cache or ResponseCache()
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def generate_content(self, contents, kind: str = None, stream: bool = False, **kwargs):
+        span = tracing.span("gemini", bytes=len(str(contents).encode()), kind=kind, cached=False).__enter__()
+        try:
+            response = self._generate(span, contents, kind, stream, **kwargs)
+        except BaseException as e:
+            span.__exit__(type(e), e, None)
+            raise
+        if stream:
+            return self._traced(span, response)
+        span.tokens = usage_tokens(response)
+        span.__exit__(None, None, None)
+        return response
+
+    @staticmethod
+    def _traced(span, chunks) -> Iterator:
+        """Keep a streamed call's span open until its last chunk."""
+        try:
+            for chunk in chunks:
+                # Every chunk carries the running total
+                span.tokens = usage_tokens(chunk) or span.tokens
+                yield chunk
+        except BaseException as e:
+            span.__exit__(type(e), e, None)
+            raise
+        span.__exit__(None, None, None)
+
+    def _generate(self, span, contents, kind: Optional[str], stream: bool, **kwargs):
+        if self.cache.ttl(kind) <= 0:
+            return self.model.generate_content(contents, stream=stream, **kwargs)
+
+        key = self.cache.key(self.model_name, contents, kwargs.get("generation_config"))
+        text = self.cache.get(key, kind)
+        if text is not None:
+            span.attrs["cached"] = True
+            return [CachedResponse(text)] if stream else CachedResponse(text)
+
+        if stream:
+            return self._stream(key, kind, self.model.generate_content(contents, stream=True, **kwargs))
+
+        response = self.model.generate_content(contents, **kwargs)
+        self.cache.put(key, self.model_name, kind, response.text)
+        return response
+
+    def _stream(self, key: str, kind: Optional[str], response) -> Iterator:
+        parts = []
+        for chunk in response:
+            try:
+                parts.append(chunk.text)
+            except ValueError:
+                pass
+            yield chunk
+        self.cache.put(key, self.model_name, kind, "".join(parts))
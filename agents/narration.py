@@ -0,0 +1,69 @@
+import logging
+import re
+from typing import Iterable, Iterator, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Sentence end: terminal punctuation, optional closing quote/bracket, then space
+BOUNDARY = re.compile(r"[.!?][\"')\]]*\s+")
+# Words whose trailing period does not end a sentence ("Dr. Rao", "Rs. 300")
+ABBREVIATIONS = {"dr", "mr", "mrs", "ms", "rs", "st", "no", "vs", "etc", "e.g", "i.e", "approx", "mg", "ml"}
+MIN_CHARS = 20  # Don't hand the speaker fragments shorter than this
+
+
+def _is_abbreviation(text: str) -> bool:
+    words = text.rstrip(".").split()
+    return bool(words) and words[-1].lower().lstrip("(") in ABBREVIATIONS
+
+
+def sentences(chunks: Iterable[str], min_chars: int = MIN_CHARS) -> Iterator[str]:
+    """Re-cut a stream of text chunks into whole sentences as they complete."""
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        for boundary in BOUNDARY.finditer(buffer):
+            candidate = buffer[start:boundary.end()].strip()
+            if len(candidate) < min_chars or _is_abbreviation(buffer[start:boundary.start() + 1]):
+                continue
+            yield candidate
+            start = boundary.end()
+        buffer = buffer[start:]
+
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def _texts(response) -> Iterator[str]:
+    for chunk in response:
+        try:
+            yield chunk.text
+        except ValueError:
+            # Chunks without text parts (safety ratings, finish reason)
+            continue
+
+
+class Narration(NamedTuple):
+    text: str        # everything that was spoken
+    complete: bool   # False if the stream broke off partway
+
+
+def narrate(session, model, prompt: str, kind: str = "narration") -> Narration:
+    """Stream `prompt` from Gemini and speak each sentence as soon as it is complete.
+
+    Time to first audio is one sentence of generation rather than the whole
+    completion. If the stream fails partway, what was already said is kept
+    and returned as incomplete instead of ending the session mid-answer; a
+    failure before the first sentence is raised, so the caller can apologise.
+    """
+    spoken = []
+    try:
+        for sentence in sentences(_texts(model.generate_content(prompt, kind=kind, stream=True))):
+            session.say(sentence)
+            spoken.append(sentence)
+    except Exception as e:
+        if not spoken:
+            raise
+        logger.warning("%s stream broke off after %d sentences: %s: %s", kind, len(spoken), type(e).__name__, e)
+        return Narration(" ".join(spoken), False)
+    return Narration(" ".join(spoken), True)
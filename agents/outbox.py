@@ -0,0 +1,224 @@
+import logging
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from email.message import EmailMessage
+from typing import NamedTuple, Optional
+
+import parsing
+import tracing
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = os.getenv("SMTP_HOST") or "smtp.gmail.com"
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SECURITY = os.getenv("SMTP_SECURITY") or "ssl"  # ssl, starttls or none (local debugging server)
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "15"))
+IDLE_SECONDS = 60       # Close the connection after this long without mail
+MAX_ATTEMPTS = 4
+BACKOFF_SECONDS = 1.0   # Doubles after every failed attempt
+
+
+class OutboxError(RuntimeError):
+    pass
+
+
+class Mail(NamedTuple):
+    to: str
+    subject: str
+    body: str
+
+
+def lab_booking(to: str, lab_name: str, patient: str, test: str, when: datetime) -> Mail:
+    """Booking confirmation sent to the lab."""
+    date, time_ = parsing.format_date(when), parsing.format_time(when)
+    return Mail(
+        to,
+        f"Lab test booking: {test} on {date}",
+        f"""To {lab_name},
+Mr/Mrs {patient} has booked {test} with you on {date} at {time_} {when.tzname()}.
+
+Regards,
+Team Tech Janta Party
+""",
+    )
+
+
+def doctor_consultation(to: str, doctor_name: str, patient: str, when: datetime, meeting_id: str, meeting_url: str) -> Mail:
+    """Consultation notice sent to the doctor, with the Zoom details."""
+    date, time_ = parsing.format_date(when), parsing.format_time(when)
+    return Mail(
+        to,
+        f"Video consultation with {patient} on {date}",
+        f"""Dear Dr. {doctor_name},
+
+Your patient {patient} has scheduled a consultation appointment with you for:
+
+Date: {date}
+Time: {time_} {when.tzname()}
+
+Meeting Details:
+- Meeting ID: {meeting_id}
+- Join via: {meeting_url}
+
+Please access the video consultation using the link above at the scheduled time.
+
+Thank you for your continued support.
+
+Warm regards,
+Medicare Team
+""",
+    )
+
+
+class Outbox:
+    """Sends mail from a background thread over one reused SMTP login.
+
+    `send()` queues a Mail and returns a Future straight away; it resolves to
+    the number of attempts taken, or raises once every retry has failed.
+    Transient failures are retried with exponential backoff; a dropped
+    connection is reopened. Set SMTP_HOST/SMTP_PORT and SMTP_SECURITY=none
+    to deliver to a local debugging server.
+    """
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        security: str = SMTP_SECURITY,
+        sender_email: str = None,
+        sender_passkey: str = None,
+        sender_name: str = None,
+        max_attempts: int = MAX_ATTEMPTS,
+        backoff: float = BACKOFF_SECONDS,
+    ):
+        self.host = host
+        self.port = port
+        self.security = security
+        self.sender_email = sender_email or os.getenv("SENDER_EMAIL")
+        self.sender_passkey = sender_passkey or os.getenv("SENDER_PASSKEY")
+        self.sender_name = sender_name or os.getenv("SENDER_NAME") or "Team Medi Care"
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.logins = 0
+
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+        self._thread.start()
+
+    def send(self, mail: Mail) -> Future:
+        future = Future()
+        # Delivery spans are tagged with the session that queued the mail
+        self._queue.put((future, mail, tracing.bind(self._deliver)))
+        return future
+
+    def connect(self) -> Future:
+        """Open and log in ahead of time, so the next send() skips the handshake."""
+        future = Future()
+        self._queue.put((future, None, tracing.bind(self._connect)))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            try:
+                job = self._queue.get(timeout=IDLE_SECONDS)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            if job is None:
+                break
+            future, mail, action = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            if mail is None:
+                try:
+                    action()
+                    future.set_result(True)
+                except Exception as e:
+                    # Anything uncaught here would stop the worker and leave every later Future pending
+                    logger.error(f"Error connecting to {self.host}: {e}")
+                    future.set_exception(e)
+                continue
+            try:
+                future.set_result(action(mail))
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error sending email to {mail.to}: {e}")
+                future.set_exception(e)
+        self._disconnect()
+
+    def _message(self, mail: Mail) -> EmailMessage:
+        if not self.sender_email:
+            raise OutboxError("SENDER_EMAIL must be set")
+        message = EmailMessage()
+        message["Subject"] = mail.subject
+        message["From"] = f"{self.sender_name} <{self.sender_email}>"
+        message["To"] = mail.to
+        message.set_content(mail.body)
+        return message
+
+    def _deliver(self, mail: Mail) -> int:
+        message = self._message(mail)
+        size = len(message.as_bytes())
+        for attempt in range(1, self.max_attempts + 1):
+            reused = self._smtp is not None
+            try:
+                with tracing.span("smtp", attempt=attempt, bytes=size, reused=reused):
+                    self._connect().send_message(message)
+                logger.info(f"Sent email to {mail.to}")
+                return attempt
+            except smtplib.SMTPRecipientsRefused:
+                raise  # Retrying won't fix the address
+            except (smtplib.SMTPException, OSError) as e:
+                self._disconnect()
+                if attempt == self.max_attempts:
+                    raise
+                self.retries += 1
+                # A pooled connection the server already dropped: reconnect at once
+                if not (reused and isinstance(e, smtplib.SMTPServerDisconnected)):
+                    time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.0))
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            if self.sender_passkey and not self.sender_email:
+                raise OutboxError("SENDER_EMAIL must be set along with SENDER_PASSKEY")
+            with tracing.span("smtp_login"):
+                if self.security == "ssl":
+                    smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT)
+                else:
+                    smtp = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+                    if self.security == "starttls":
+                        smtp.starttls()
+                if self.sender_passkey:
+                    smtp.login(self.sender_email, self.sender_passkey)
+            self.logins += 1
+            self._smtp = smtp
+        return self._smtp
+
+    def _disconnect(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "sent": self.sent, "failed": self.failed,
+                "retries": self.retries, "logins": self.logins}
+
+    def close(self, timeout: float = 30) -> None:
+        """Finish sending what is queued, then close the connection."""
+        self._queue.put(None)
+        self._thread.join(timeout)
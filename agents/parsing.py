@@ -0,0 +1,286 @@
+import os
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Any, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from extract import BookingSlot, ExtractionError, extract
+
+# Local parsers answer when they are at least this sure; otherwise the model does
+CONFIDENCE_THRESHOLD = 0.75
+
+TIMEZONE = ZoneInfo(os.getenv("BOOKING_TIMEZONE", "Asia/Kolkata"))
+
+
+class Parsed(NamedTuple):
+    value: Any
+    source: str          # "local" or "llm"
+    confidence: float
+
+
+AFFIRMATIVE = {
+    "yes", "yeah", "yea", "yep", "yup", "sure", "ok", "okay", "alright", "fine",
+    "definitely", "absolutely", "certainly", "correct", "right", "please", "book",
+    "schedule", "confirm", "go",
+}
+NEGATIVE = {
+    "no", "nope", "nah", "not", "don't", "dont", "do not", "never", "cancel",
+    "stop", "later", "wait",
+}
+
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3,
+    "april": 4, "apr": 4, "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7,
+    "august": 8, "aug": 8, "september": 9, "sep": 9, "sept": 9, "october": 10,
+    "oct": 10, "november": 11, "nov": 11, "december": 12, "dec": 12,
+}
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "thirty": 30,
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5, "sixth": 6,
+    "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10, "eleventh": 11,
+    "twelfth": 12, "thirteenth": 13, "fourteenth": 14, "fifteenth": 15,
+    "sixteenth": 16, "seventeenth": 17, "eighteenth": 18, "nineteenth": 19,
+    "twentieth": 20, "thirtieth": 30,
+}
+
+# "my name is X" is a name; "I am X" is as often "I am looking for ..." or "I am fine"
+NAME_PATTERNS = [
+    (re.compile(r"\b(?:my name is|my name's|name is|call me)\s+([a-z][a-z .'-]*)", re.I), 1.0),
+    (re.compile(r"\b(?:i am|i'm|this is|it's|it is)\s+([a-z][a-z .'-]*)", re.I), 0.6),
+]
+NOT_NAMES = AFFIRMATIVE | NEGATIVE | {
+    "hello", "hi", "hey", "the", "a", "an", "and", "um", "uh", "thank", "thanks", "you",
+    "i", "i'm", "am", "is", "it", "it's", "this", "my", "me", "here", "speaking", "calling",
+    "looking", "for", "from", "to", "with", "but", "so", "sir", "madam", "good", "well",
+    "just", "want", "need", "would", "like", "sorry", "there", "name", "none", "unknown",
+}
+
+MONTH_RE = "|".join(sorted(MONTHS, key=len, reverse=True))
+DAY_MONTH = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({MONTH_RE})\b")
+MONTH_DAY = re.compile(rf"\b({MONTH_RE})\s+(\d{{1,2}})(?:st|nd|rd|th)?\b")
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?\b")
+CLOCK_TIME = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*(a\.?\s?m\.?|p\.?\s?m\.?)(?=\W|$)")
+TWENTY_FOUR_HOUR = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b")
+O_CLOCK = re.compile(r"\b(\d{1,2})\s*o'?\s?clock\b")
+
+
+def normalise(text: str) -> str:
+    text = str(text).lower().replace("’", "'")
+    # "twenty sixth" -> "26", "eight" -> "8"
+    words = re.findall(r"[a-z0-9'.:/-]+|[^\sa-z0-9]", text)
+    out = []
+    for word in words:
+        value = NUMBER_WORDS.get(word.strip("."))
+        if value is not None and out and out[-1].isdigit() and int(out[-1]) in (20, 30) and value < 10:
+            out[-1] = str(int(out[-1]) + value)
+        elif value is not None:
+            out.append(str(value))
+        else:
+            out.append(word)
+    return " ".join(out)
+
+
+def parse_yes_no(text: str) -> Parsed:
+    words = re.findall(r"[a-z']+", str(text).lower())
+    joined = " ".join(words)
+    yes = sum(word in AFFIRMATIVE for word in words)
+    no = sum(word in NEGATIVE for word in words) + joined.count("do not")
+
+    if yes and not no:
+        return Parsed(True, "local", 1.0 if words[0] in AFFIRMATIVE else 0.8)
+    if no and not yes:
+        return Parsed(False, "local", 1.0 if words[0] in NEGATIVE else 0.8)
+    if yes and no:
+        # "no, yes please" / "yes, not later": trust the first decisive word, weakly
+        first = next(word for word in words if word in AFFIRMATIVE or word in NEGATIVE)
+        return Parsed(first in AFFIRMATIVE, "local", 0.5)
+    return Parsed(None, "local", 0.0)
+
+
+def _name_words(text: str) -> list:
+    # Up to three words, stopping at the first that can't be part of a name
+    words = []
+    for word in re.findall(r"[a-z'-]+", text, re.I)[:3]:
+        if word.lower() in NOT_NAMES:
+            break
+        words.append(word)
+    return words
+
+
+def parse_name(text: str) -> Parsed:
+    text = str(text).strip()
+    for pattern, confidence in NAME_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            words = _name_words(match.group(1))
+            if words:
+                return Parsed(" ".join(w.capitalize() for w in words), "local", confidence)
+
+    # A bare "Abraham." is probably the name itself, but "Raining" fits too; let the model check
+    words = re.findall(r"[a-z'-]+", text, re.I)
+    if 1 <= len(words) <= 3 and not any(w.lower() in NOT_NAMES for w in words):
+        return Parsed(" ".join(w.capitalize() for w in words), "local", 0.6)
+    return Parsed(None, "local", 0.0)
+
+
+def _next_occurrence(month: int, day: int, today: date) -> Optional[date]:
+    for year in (today.year, today.year + 1):
+        try:
+            candidate = date(year, month, day)
+        except ValueError:
+            return None
+        if candidate >= today:
+            return candidate
+    return None
+
+
+def parse_date(text: str, today: date = None) -> Parsed:
+    today = today or datetime.now(TIMEZONE).date()
+    text = normalise(text)
+
+    match = DAY_MONTH.search(text)
+    if match:
+        day, month = int(match.group(1)), MONTHS[match.group(2)]
+        return Parsed(_next_occurrence(month, day, today), "local", 1.0)
+    match = MONTH_DAY.search(text)
+    if match:
+        month, day = MONTHS[match.group(1)], int(match.group(2))
+        return Parsed(_next_occurrence(month, day, today), "local", 1.0)
+
+    if "day after tomorrow" in text:
+        return Parsed(today + timedelta(days=2), "local", 0.9)
+    if "tomorrow" in text:
+        return Parsed(today + timedelta(days=1), "local", 0.9)
+    if "today" in text:
+        return Parsed(today, "local", 0.9)
+
+    for index, weekday in enumerate(WEEKDAYS):
+        if re.search(rf"\b{weekday}\b", text):
+            days = (index - today.weekday()) % 7 or 7
+            return Parsed(today + timedelta(days=days), "local", 0.8)
+
+    match = NUMERIC_DATE.search(text)
+    if match:
+        # 03/04 could be either order; let the model confirm
+        day, month = int(match.group(1)), int(match.group(2))
+        return Parsed(_next_occurrence(month, day, today), "local", 0.6)
+
+    return Parsed(None, "local", 0.0)
+
+
+def parse_time(text: str) -> Parsed:
+    text = normalise(text)
+
+    if re.search(r"\bnoon\b|\bmidday\b", text):
+        return Parsed(time(12, 0), "local", 1.0)
+    if re.search(r"\bmidnight\b", text):
+        return Parsed(time(0, 0), "local", 1.0)
+
+    match = CLOCK_TIME.search(text)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if 1 <= hour <= 12 and minute < 60:
+            pm = match.group(3).startswith("p")
+            hour = hour % 12 + (12 if pm else 0)
+            return Parsed(time(hour, minute), "local", 1.0)
+
+    match = TWENTY_FOUR_HOUR.search(text)
+    if match:
+        return Parsed(time(int(match.group(1)), int(match.group(2))), "local", 0.9)
+
+    match = O_CLOCK.search(text)
+    if match and 1 <= int(match.group(1)) <= 12:
+        hour = int(match.group(1))
+        if "evening" in text or "night" in text or "afternoon" in text:
+            return Parsed(time(hour % 12 + 12, 0), "local", 0.9)
+        if "morning" in text:
+            return Parsed(time(hour % 12, 0), "local", 0.9)
+        return Parsed(time(hour, 0), "local", 0.5)
+
+    return Parsed(None, "local", 0.0)
+
+
+def format_date(value: date) -> str:
+    return f"{value.strftime('%B')} {value.day}"
+
+
+def format_time(value: time) -> str:
+    hour = value.hour % 12 or 12
+    minutes = f":{value.minute:02d}" if value.minute else ""
+    return f"{hour}{minutes} {'P.M' if value.hour >= 12 else 'A.M'}"
+
+
+# Local first, model only when the local answer is not confident enough
+
+def confirm(model, text: str) -> Parsed:
+    local = parse_yes_no(text)
+    if local.confidence >= CONFIDENCE_THRESHOLD:
+        return local
+
+    if not str(text).strip():
+        return local
+
+    prompt = f"Detect whether the user is saying Yes or No: {text}. Answer Yes, No or Unclear. Don't add any other words."
+    answer = model.generate_content(prompt, kind="confirm").text.strip().strip(".").lower()
+    # Anything but a clear Yes or No leaves the value unset, so the question is asked again
+    if answer in ("yes", "no"):
+        return Parsed(answer == "yes", "llm", 1.0)
+    return Parsed(None, "llm", 0.0)
+
+
+def name(model, text: str) -> Parsed:
+    local = parse_name(text)
+    if local.confidence >= CONFIDENCE_THRESHOLD or not str(text).strip():
+        return local
+
+    prompt = f"Fetch just the Name (ex: Abraham) to the user from: {text}. Answer None if there is no name. Don't add any other words"
+    # "I'm sorry, ..." or "There is no name." is not a name either, so the reply goes through the same checks
+    reply = parse_name(model.generate_content(prompt, kind="name").text.strip())
+    if reply.value is None:
+        return Parsed(None, "llm", 0.0)
+    return Parsed(reply.value, "llm", 1.0)
+
+
+def booking_parts(model, text: str) -> Tuple[Parsed, Parsed]:
+    """The date and the time of day in "26 March 8 AM" style answers.
+
+    Either value is None when neither the local parsers nor the model could
+    find it, so the caller can ask again for just the missing part.
+    """
+    day = parse_date(text)
+    hour = parse_time(text)
+    if min(day.confidence, hour.confidence) >= CONFIDENCE_THRESHOLD and day.value:
+        return day, hour
+    if not str(text).strip():
+        # Nothing was heard; both parts are asked for again
+        return day, hour
+
+    try:
+        slot = extract(model, text, BookingSlot, kind="booking")
+    except ExtractionError:
+        slot = BookingSlot()
+
+    # The model's answer is re-parsed locally so both paths yield real date/time values
+    if day.confidence < CONFIDENCE_THRESHOLD or not day.value:
+        day = Parsed(parse_date(slot.date).value if slot.date else None, "llm", 1.0)
+    if hour.confidence < CONFIDENCE_THRESHOLD:
+        hour = Parsed(parse_time(slot.time).value if slot.time else None, "llm", 1.0)
+    return day, hour
+
+
+def at(day: date, hour: time) -> datetime:
+    """A booking's start as a timezone-aware datetime."""
+    return datetime.combine(day, hour, TIMEZONE)
+
+
+def time_of_day(model, text: str) -> Parsed:
+    """Just the time ("8 A.M", "half past six in the evening"); the model only if unsure."""
+    local = parse_time(text)
+    if local.confidence >= CONFIDENCE_THRESHOLD:
+        return local
+    return booking_parts(model, text)[1]
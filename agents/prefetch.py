@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List
+
+import tracing
+
+MAX_WORKERS = 4
+
+
+class Speculation:
+    """Work started before we know it will be needed."""
+
+    def __init__(self, speculator: "Speculator", name: str):
+        self.speculator = speculator
+        self.name = name
+        self.future: Future = None
+        self.runtime = 0.0  # seconds the work itself ran, not counting the wait for the caller
+        self.settled = False
+
+    def _run(self, fn, *args):
+        start = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            self.runtime = time.monotonic() - start
+
+    def keep(self) -> Future:
+        """The caller went ahead; the work counts as useful."""
+        if not self.settled:
+            self.settled = True
+            self.speculator._record("kept")
+        return self.future
+
+    def discard(self) -> None:
+        """The caller said no; cancel the work, or write it off if it already ran."""
+        if self.settled:
+            return
+        self.settled = True
+        if self.future.cancel():
+            self.speculator._record("cancelled")
+        else:
+            self.speculator._record("wasted")
+            # Runs right away if the work already finished while the caller was deciding
+            self.future.add_done_callback(lambda _: self.speculator._waste(self.runtime))
+
+
+class Speculator:
+    """Runs likely-needed steps while the caller is still answering.
+
+    The booking flows start warm-ups (Zoom token, SMTP login) as soon as a
+    lab or doctor is offered, keep() them on "Yes" and discard() them on
+    "No". stats() reports how much of that work was thrown away.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self.counts = {"started": 0, "kept": 0, "cancelled": 0, "wasted": 0}
+        self.wasted_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def start(self, name: str, fn, *args) -> Speculation:
+        with self._lock:
+            self.counts["started"] += 1
+        speculation = Speculation(self, name)
+        speculation.future = self.executor.submit(tracing.bind(speculation._run), fn, *args)
+        return speculation
+
+    def start_all(self, **steps) -> List[Speculation]:
+        """start() each name=callable pair."""
+        return [self.start(name, fn) for name, fn in steps.items()]
+
+    def _record(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def _waste(self, seconds: float) -> None:
+        with self._lock:
+            self.wasted_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            settled = self.counts["kept"] + self.counts["cancelled"] + self.counts["wasted"]
+            return {
+                **self.counts,
+                "wasted_seconds": round(self.wasted_seconds, 3),
+                "waste_ratio": round(self.counts["wasted"] / settled, 3) if settled else 0.0,
+            }
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def keep(speculations: List[Speculation]) -> None:
+    for speculation in speculations:
+        speculation.keep()
+
+
+def discard(speculations: List[Speculation]) -> None:
+    for speculation in speculations:
+        speculation.discard()
@@ -0,0 +1,36 @@
+import re
+
+# Brand and alternate names -> the generic name we search for
+DRUG_NAMES = {
+    "crocin": "paracetamol",
+    "dolo": "paracetamol",
+    "calpol": "paracetamol",
+    "tylenol": "paracetamol",
+    "acetaminophen": "paracetamol",
+    "advil": "ibuprofen",
+    "brufen": "ibuprofen",
+    "combiflam": "ibuprofen paracetamol",
+    "disprin": "aspirin",
+    "ecosprin": "aspirin",
+    "glycomet": "metformin",
+    "augmentin": "amoxicillin clavulanate",
+    "azithral": "azithromycin",
+    "zithromax": "azithromycin",
+    "pantocid": "pantoprazole",
+    "omez": "omeprazole",
+    "allegra": "fexofenadine",
+    "cetzine": "cetirizine",
+    "zyrtec": "cetirizine",
+}
+
+# Dosage forms say nothing about the drug itself
+FORMS = {"tablet", "tablets", "tab", "tabs", "capsule", "capsules", "cap", "syrup", "medicine", "drug"}
+
+
+def canonical_query(query: str) -> str:
+    """Lowercase, drop dosage forms and map brand names to generics.
+
+    "Side effects of Crocin tablets?" becomes "side effects of paracetamol".
+    """
+    words = re.findall(r"[a-z0-9]+", query.lower())
+    return " ".join(DRUG_NAMES.get(word, word) for word in words if word not in FORMS)
@@ -0,0 +1,133 @@
+import os
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import List, NamedTuple, Union
+
+import psycopg2
+from psycopg2 import errors
+from psycopg2.pool import ThreadedConnectionPool
+
+import tracing
+
+
+class LabTest(NamedTuple):
+    name: str
+    lab_name: str
+    price: Union[int, float, Decimal]
+    description: str
+    contact: str
+
+
+class Doctor(NamedTuple):
+    name: str
+    email: str
+    specialisation: str
+
+
+# Server-side prepared statements, created once per pooled connection
+STATEMENTS = {
+    "lab_test_names": (
+        "",
+        "SELECT DISTINCT name FROM lab_tests ORDER BY name",
+    ),
+    "find_lab_tests": (
+        "(text)",
+        'SELECT name, "labName", price, description, contact FROM lab_tests '
+        "WHERE lower(name) = lower($1) ORDER BY price",
+    ),
+    "find_doctors": (
+        "(text)",
+        "SELECT name, email, specialisation FROM doctors "
+        "WHERE specialisation ILIKE '%' || $1 || '%' ORDER BY name",
+    ),
+    "all_doctors": (
+        "",
+        "SELECT name, email, specialisation FROM doctors ORDER BY specialisation, name",
+    ),
+}
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_prepared = set()
+
+
+def get_pool() -> ThreadedConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    1,
+                    POOL_SIZE,
+                    host=os.getenv("DB_HOST"),
+                    port=os.getenv("DB_PORT"),
+                    dbname=os.getenv("DB_NAME"),
+                    user=os.getenv("DB_USER"),
+                    password=os.getenv("DB_PASSWORD"),
+                )
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _prepared.clear()
+
+
+@contextmanager
+def connection():
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.rollback()  # read-only: end the transaction before handing it back
+    except psycopg2.Error:
+        pool.putconn(conn, close=True)
+        conn = None
+        raise
+    finally:
+        if conn is not None:
+            pool.putconn(conn)
+
+
+def _execute(name: str, *params) -> list:
+    types, sql = STATEMENTS[name]
+    placeholders = f"({', '.join(['%s'] * len(params))})" if params else ""
+
+    with tracing.span("db", statement=name) as span, connection() as conn, conn.cursor() as cur:
+        key = (id(conn), name)
+        if key not in _prepared:
+            cur.execute(f"PREPARE {name} {types} AS {sql}")
+            _prepared.add(key)
+        try:
+            cur.execute(f"EXECUTE {name} {placeholders}", params)
+        except errors.InvalidSqlStatementName:
+            # The pool handed out a fresh connection that reused an old id
+            conn.rollback()
+            cur.execute(f"PREPARE {name} {types} AS {sql}")
+            cur.execute(f"EXECUTE {name} {placeholders}", params)
+        rows = cur.fetchall()
+        span.attrs["rows"] = len(rows)
+        return rows
+
+
+def lab_test_names() -> List[str]:
+    return [row[0] for row in _execute("lab_test_names")]
+
+
+def find_lab_tests(name: str) -> List[LabTest]:
+    return [LabTest(*row) for row in _execute("find_lab_tests", name)]
+
+
+def find_doctors(specialisation: str) -> List[Doctor]:
+    return [Doctor(*row) for row in _execute("find_doctors", specialisation)]
+
+
+def all_doctors() -> List[Doctor]:
+    return [Doctor(*row) for row in _execute("all_doctors")]
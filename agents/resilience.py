@@ -0,0 +1,292 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, NamedTuple, Optional
+
+import tracing
+from llm_cache import CachedResponse
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = int(os.getenv("RESILIENCE_WORKERS", "64"))
+# Retries and hedges may add this fraction of calls on top of the first attempts...
+BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))
+# ...plus a trickle per second, so a quiet process can still retry
+BUDGET_PER_SECOND = float(os.getenv("RETRY_BUDGET_PER_SECOND", "1"))
+BUDGET_MAX = 20
+LATENCY_WINDOW = 500   # recent successful calls per name kept for the p95
+MIN_SAMPLES = 20       # no hedging until this many calls have been seen
+FAILOVER_MODEL = os.getenv("GROQ_FAILOVER_MODEL") or "llama3-70b-8192"
+# Over gRPC a request timeout bounds the whole stream, so it has to cover the longest narration
+STREAM_SECONDS = float(os.getenv("GEMINI_STREAM_SECONDS", "120"))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = ("Timeout", "Connection", "Unavailable", "ResourceExhausted", "DeadlineExceeded", "InternalServer", "RateLimit")
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Policy(NamedTuple):
+    timeout: float         # seconds per attempt
+    deadline: float        # seconds for the whole call, retries included
+    attempts: int = 3
+    backoff: float = 0.25  # first retry waits up to this long; doubles each time (full jitter)
+    hedge: bool = False    # send a duplicate once an attempt outlives the recent p95
+
+
+POLICIES: Dict[str, Policy] = {
+    "transcribe": Policy(timeout=15, deadline=30, hedge=True),
+    "gemini": Policy(timeout=15, deadline=30, hedge=True),
+    # Only opening the stream is covered; once chunks arrive they are being spoken.
+    # The SDK's own timeout for streams is STREAM_SECONDS, not this
+    "gemini_stream": Policy(timeout=10, deadline=20, attempts=2),
+    # A web-searching agent run is too expensive to duplicate
+    "agent": Policy(timeout=45, deadline=60, attempts=2, backoff=1.0),
+    "groq_chat": Policy(timeout=10, deadline=15, attempts=2),
+}
+DEFAULT_POLICY = Policy(timeout=15, deadline=30)
+
+
+def retryable(error: BaseException) -> bool:
+    """Timeouts, dropped connections, rate limits and 5xx; not bad requests or auth."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS
+    return any(part in type(error).__name__ for part in RETRYABLE_NAMES)
+
+
+class RetryBudget:
+    """Token bucket shared by every call, so retries can't multiply an outage.
+
+    Each first attempt deposits BUDGET_RATIO of a token and the bucket also
+    refills slowly over time; a retry or hedge spends a whole token.
+    """
+
+    def __init__(self, ratio: float = BUDGET_RATIO, per_second: float = BUDGET_PER_SECOND, maximum: float = BUDGET_MAX):
+        self.ratio = ratio
+        self.per_second = per_second
+        self.maximum = maximum
+        self.tokens = maximum
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.maximum, self.tokens + (now - self._refilled) * self.per_second)
+        self._refilled = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class LatencyTracker:
+    """p95 of recent successful calls, per name."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._p95: Dict[str, Optional[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.setdefault(name, deque(maxlen=self.window))
+            samples.append(seconds)
+            self._p95.pop(name, None)
+
+    def p95(self, name: str) -> Optional[float]:
+        with self._lock:
+            if name not in self._p95:
+                samples = sorted(self._samples.get(name, ()))
+                self._p95[name] = samples[int(len(samples) * 0.95)] if len(samples) >= MIN_SAMPLES else None
+            return self._p95[name]
+
+
+class Resilient:
+    """Runs blocking SDK calls with deadlines, budgeted retries, hedging and failover.
+
+    Attempts run on a worker pool so the caller can stop waiting at the
+    deadline; an abandoned attempt is left to finish (pass the SDK's own
+    timeout too, so it does). With hedging on, an attempt still running
+    after the recent p95 gets a duplicate and the first answer wins.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, budget: RetryBudget = None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resilient")
+        self.budget = budget or RetryBudget()
+        self.latency = LatencyTracker()
+        self.counts = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "timeouts": 0,
+                       "failovers": 0, "budget_exhausted": 0, "failed": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def call(self, name: str, fn: Callable, *args, policy: Policy = None, fallback: Callable = None, **kwargs):
+        """fn(*args, **kwargs) under `policy` (POLICIES[name] by default).
+
+        If every attempt fails and `fallback` is given, its result is
+        returned instead, e.g. the same prompt sent to another provider.
+        """
+        policy = policy or POLICIES.get(name, DEFAULT_POLICY)
+        self._count("calls")
+        self.budget.deposit()
+        try:
+            return self._attempts(name, fn, args, kwargs, policy)
+        except Exception as e:
+            if fallback is None:
+                self._count("failed")
+                raise
+            self._count("failovers")
+            logger.warning("%s failed (%s: %s); failing over", name, type(e).__name__, e)
+            return fallback()
+
+    def _attempts(self, name: str, fn: Callable, args, kwargs, policy: Policy):
+        deadline = time.monotonic() + policy.deadline
+        error = None
+        for attempt in range(1, policy.attempts + 1):
+            if attempt > 1:
+                if not retryable(error):
+                    break
+                if not self.budget.withdraw():
+                    self._count("budget_exhausted")
+                    break
+                delay = random.uniform(0, policy.backoff * 2 ** (attempt - 2))
+                if time.monotonic() + delay >= deadline:
+                    break
+                self._count("retries")
+                time.sleep(delay)
+            try:
+                return self._attempt(name, fn, args, kwargs, policy, deadline)
+            except Exception as e:
+                logger.info("%s attempt %d failed: %s: %s", name, attempt, type(e).__name__, e)
+                error = e
+        raise error
+
+    def _attempt(self, name: str, fn: Callable, args, kwargs, policy: Policy, deadline: float):
+        start = time.monotonic()
+        timeout = min(policy.timeout, deadline - start)
+        # Spans recorded inside fn still belong to the caller's session. Each
+        # submission needs its own copy: a context can't be entered twice at once
+        futures = [self.executor.submit(tracing.bind(fn), *args, **kwargs)]
+
+        if policy.hedge:
+            delay = self.latency.p95(name)
+            if delay is not None and delay < timeout:
+                done, _ = wait(futures, timeout=delay)
+                if not done and self.budget.withdraw():
+                    self._count("hedges")
+                    futures.append(self.executor.submit(tracing.bind(fn), *args, **kwargs))
+
+        pending, error = set(futures), None
+        while pending:
+            remaining = start + timeout - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self._count("hedge_wins")
+                    self.latency.observe(name, time.monotonic() - start)
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+
+        if not pending:
+            raise error
+        for future in pending:
+            future.cancel()
+        self._count("timeouts")
+        raise DeadlineExceeded(f"{name} took longer than {timeout:.1f}s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        p95 = {name: self.latency.p95(name) for name in POLICIES}
+        return {
+            **counts,
+            "budget_tokens": round(self.budget.tokens, 2),
+            "p95_ms": {name: round(value * 1000, 1) for name, value in p95.items() if value is not None},
+        }
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+RESILIENT = Resilient()
+
+
+def call(name: str, fn: Callable, *args, **kwargs):
+    """RESILIENT.call(...); the retry budget is shared by the whole process."""
+    return RESILIENT.call(name, fn, *args, **kwargs)
+
+
+def stats() -> dict:
+    return RESILIENT.stats()
+
+
+class ResilientModel:
+    """Wraps a GenerativeModel so every generate_content has a deadline and retries.
+
+    Plain prompts are hedged; for streamed ones only opening the stream is
+    retried. JSON-mode prompts (the extractions in extract.py) fail over to
+    `failover(contents)` once Gemini has run out of attempts.
+    """
+
+    def __init__(self, model, failover: Callable = None):
+        self.model = model
+        self.failover = failover
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        name = "gemini_stream" if stream else "gemini"
+        # Abandoned attempts give up on their own instead of holding a worker
+        kwargs.setdefault("request_options", {"timeout": STREAM_SECONDS if stream else POLICIES[name].timeout})
+        if stream:
+            return call(name, self.model.generate_content, contents, stream=True, **kwargs)
+
+        config = kwargs.get("generation_config") or {}
+        fallback = None
+        if self.failover is not None and config.get("response_mime_type") == "application/json":
+            fallback = lambda: self.failover(contents)
+        return call(name, self.model.generate_content, contents, fallback=fallback, **kwargs)
+
+
+def groq_json(client, model: str = FAILOVER_MODEL) -> Callable:
+    """A `failover` for ResilientModel: the same prompt to a Groq llama model in JSON mode."""
+
+    def complete(contents) -> CachedResponse:
+        response = call(
+            "groq_chat",
+            client.chat.completions.create,
+            model=model,
+            messages=[{"role": "user", "content": str(contents)}],
+            response_format={"type": "json_object"},
+            timeout=POLICIES["groq_chat"].timeout,
+        )
+        return CachedResponse(response.choices[0].message.content)
+
+    return complete
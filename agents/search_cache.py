@@ -0,0 +1,95 @@
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict
+
+from phi.tools.duckduckgo import DuckDuckGo
+
+import tracing
+from llm_cache import ResponseCache
+from queries import canonical_query
+
+PATH = os.getenv("SEARCH_CACHE_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_cache.sqlite3")
+MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+
+# Drug facts barely move; news does
+TTLS = {
+    "search": float(os.getenv("SEARCH_CACHE_TTL", str(7 * 24 * 3600))),
+    "news": float(os.getenv("SEARCH_NEWS_TTL", str(6 * 3600))),
+}
+
+
+class CachedDuckDuckGo(DuckDuckGo):
+    """DuckDuckGo tool that answers repeated searches from a local cache.
+
+    Queries are canonicalised before lookup. Results are kept in a TTL'd
+    LRU on disk, shared by every session. Identical searches already in
+    flight are coalesced: one request goes out and every waiter gets its
+    result.
+    """
+
+    def __init__(self, cache: ResponseCache = None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache or ResponseCache(PATH, max_entries=MAX_ENTRIES, max_age=max(TTLS.values()), ttls=TTLS)
+        self.coalesced = 0
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def duckduckgo_search(self, query: str, max_results: int = 5) -> str:
+        """Use this function to search DuckDuckGo for a query.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The result from DuckDuckGo.
+        """
+        return self._cached("search", query, max_results, super().duckduckgo_search)
+
+    def duckduckgo_news(self, query: str, max_results: int = 5) -> str:
+        """Use this function to get the latest news from DuckDuckGo.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The latest news from DuckDuckGo.
+        """
+        return self._cached("news", query, max_results, super().duckduckgo_news)
+
+    def _cached(self, kind: str, query: str, max_results: int, fetch: Callable[[str, int], str]) -> str:
+        canonical = canonical_query(query) or query
+        key = self.cache.key(kind, canonical, self.fixed_max_results or max_results)
+        result = self.cache.get(key, kind)
+        if result is not None:
+            return result
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            self.coalesced += 1
+            return future.result()
+
+        try:
+            with tracing.span("search", kind=kind) as span:
+                result = fetch(canonical, max_results)
+                span.bytes = len(result.encode())
+            # An empty result is usually a rate limit or a typo; don't pin it
+            if result.strip() not in ("", "[]"):
+                self.cache.put(key, "duckduckgo", kind, result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "coalesced": self.coalesced}
@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from queries import canonical_query
+
+PATH = os.getenv("SEMANTIC_CACHE_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "answers.sqlite3")
+DIMENSIONS = int(os.getenv("SEMANTIC_CACHE_DIMENSIONS", "4096"))
+THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+MAX_AGE = float(os.getenv("SEMANTIC_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+NGRAMS = (3, 4, 5)
+WORD_WEIGHT = 2.0  # whole words count more than their fragments
+
+# Question filler that says nothing about what is being asked
+STOPWORDS = {
+    "what", "whats", "is", "are", "the", "a", "an", "of", "for", "to", "do", "does", "can", "i", "me",
+    "my", "about", "tell", "please", "you", "it", "its", "in", "on", "with", "and", "or", "any",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+class Hit(NamedTuple):
+    question: str
+    answer: str
+    score: float
+    age: float  # seconds
+
+
+def _bucket(feature: str) -> int:
+    # crc32 rather than hash(): stable across processes
+    return zlib.crc32(feature.encode()) % DIMENSIONS
+
+
+def vectorise(text: str) -> np.ndarray:
+    """Hashed term frequencies of a question's words and character n-grams."""
+    words = [w for w in canonical_query(text).split() if w not in STOPWORDS]
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for word in words:
+        vector[_bucket("w:" + word)] += WORD_WEIGHT
+        padded = f" {word} "
+        for n in NGRAMS:
+            for i in range(len(padded) - n + 1):
+                vector[_bucket(padded[i:i + n])] += 1.0
+    # Sublinear tf so a repeated word doesn't dominate
+    np.log1p(vector, out=vector)
+    return vector
+
+
+class SemanticCache:
+    """Previously narrated answers, looked up by question similarity.
+
+    Questions are embedded with a hashed TF-IDF over words and character
+    n-grams (no model, no network) and kept as rows of one matrix; lookup is
+    a cosine top-k. Answers persist in SQLite and the matrix is rebuilt from
+    them at startup.
+    """
+
+    def __init__(self, path: str = PATH, threshold: float = THRESHOLD, max_age: float = MAX_AGE, max_entries: int = MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.executescript(SCHEMA)
+
+        self._db.execute("DELETE FROM answers WHERE created < ?", (time.time() - max_age,))
+        rows = self._db.execute(
+            "SELECT question, answer, created FROM answers ORDER BY created DESC LIMIT ?", (max_entries,)
+        ).fetchall()[::-1]
+        self.questions: List[str] = [r[0] for r in rows]
+        self.answers: List[str] = [r[1] for r in rows]
+        self.created = np.array([r[2] for r in rows], dtype=np.float64)
+        self.tf = np.stack([vectorise(q) for q in self.questions]) if rows else np.zeros((0, DIMENSIONS), np.float32)
+        self._index = None  # (idf, row-normalised tf-idf matrix), rebuilt after writes
+
+    def _build(self):
+        if self._index is None:
+            df = np.count_nonzero(self.tf, axis=0)
+            idf = np.log((1 + len(self.tf)) / (1 + df)).astype(np.float32) + 1.0
+            matrix = self.tf * idf
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._index = (idf, matrix / np.maximum(norms, 1e-9))
+        return self._index
+
+    def search(self, question: str, k: int = 3) -> List[Hit]:
+        """The `k` most similar unexpired questions, best first."""
+        with self._lock:
+            if not self.questions:
+                return []
+            idf, matrix = self._build()
+            query = vectorise(question) * idf
+            norm = np.linalg.norm(query)
+            if not norm:
+                return []
+            scores = matrix @ (query / norm)
+            ages = time.time() - self.created
+            scores[ages > self.max_age] = -1.0
+            top = np.argsort(-scores)[:k]
+            return [Hit(self.questions[i], self.answers[i], float(scores[i]), float(ages[i])) for i in top if scores[i] >= 0]
+
+    def lookup(self, question: str) -> Optional[Hit]:
+        """The closest earlier answer if it clears the threshold, else None."""
+        hits = self.search(question, k=1)
+        if hits and hits[0].score >= self.threshold:
+            self.hits += 1
+            return hits[0]
+        self.misses += 1
+        return None
+
+    def add(self, question: str, answer: str) -> None:
+        now = time.time()
+        vector = vectorise(question)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO answers (question, answer, created) VALUES (?, ?, ?)", (question, answer, now)
+            )
+            self.questions.append(question)
+            self.answers.append(answer)
+            self.created = np.append(self.created, now)
+            self.tf = np.vstack([self.tf, vector])
+            if len(self.questions) > self.max_entries:
+                drop = len(self.questions) - self.max_entries
+                del self.questions[:drop], self.answers[:drop]
+                self.created, self.tf = self.created[drop:], self.tf[drop:]
+                self._db.execute("DELETE FROM answers WHERE created < ?", (self.created[0],))
+            self._index = None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self.questions), "hits": self.hits, "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
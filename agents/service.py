@@ -0,0 +1,134 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+import doctor
+import doubts
+import lab
+import resilience
+import tracing
+from clients import Clients
+from session import Session, SessionRunner
+
+FLOWS = {"lab": lab, "doctor": doctor, "doubts": doubts}
+
+
+class StartRequest(BaseModel):
+    flow: str
+    session_id: Optional[str] = None  # an abandoned session's ID resumes it
+
+
+class TurnResponse(BaseModel):
+    session_id: str
+    flow: str
+    messages: List[str]
+    done: bool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pay for clients, DB pool, indexes and the TTS engine once, at startup
+    clients = Clients()
+    for module in FLOWS.values():
+        module.warm(clients)
+    # The CLI builds these on first use; a server builds them before its first caller
+    clients.preload("gemini", "groq", "zoom", "outbox", "speculator")
+
+    runner = SessionRunner(clients)
+    app.state.clients = clients
+    app.state.runner = runner
+
+    # Drop sessions whose caller walked away mid-flow
+    async def reap():
+        while True:
+            await asyncio.sleep(60)
+            runner.reap()
+
+    reaper = asyncio.create_task(reap())
+    yield
+    reaper.cancel()
+    runner.shutdown()
+    clients.close()
+    resilience.RESILIENT.close()
+    tracing.TRACER.close()
+
+
+app = FastAPI(title="Medi Care agents", lifespan=lifespan)
+
+
+async def reply(session: Session, messages: List[str], audio_reply: bool):
+    if not audio_reply:
+        return TurnResponse(session_id=session.id, flow=session.flow_name, messages=messages, done=session.done)
+
+    runner = app.state.runner
+    return Response(
+        content=await runner.run_blocking(app.state.clients.synthesize, " ".join(messages)),
+        media_type="audio/wav",
+        headers={"X-Session-Id": session.id, "X-Session-Done": str(session.done).lower()},
+    )
+
+
+@app.post("/sessions", response_model=TurnResponse)
+async def start_session(body: StartRequest, audio_reply: bool = False):
+    if body.flow not in FLOWS:
+        raise HTTPException(status_code=404, detail=f"Unknown flow {body.flow!r}")
+
+    session, messages = await app.state.runner.start(FLOWS[body.flow].flow, body.session_id)
+    return await reply(session, messages, audio_reply)
+
+
+@app.post("/sessions/{session_id}/turns", response_model=TurnResponse)
+async def take_turn(
+    session_id: str,
+    text: Optional[str] = Form(None),
+    audio_file: Optional[UploadFile] = File(None),
+    audio_reply: bool = False,
+):
+    if text is None and audio_file is None:
+        raise HTTPException(status_code=422, detail="Send either text or audio_file")
+
+    upload = None
+    if text is None:
+        upload = (audio_file.filename or "audio.wav", await audio_file.read())
+
+    try:
+        session, messages = await app.state.runner.turn(session_id, text=text, upload=upload)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found or already finished")
+    return await reply(session, messages, audio_reply)
+
+
+@app.get("/stats")
+async def stats():
+    clients = app.state.clients
+    return {
+        "sessions": len(app.state.runner.sessions),
+        "llm_cache": clients.gemini.cache.stats(),
+        "doctor_index": clients.doctor_index.stats(),
+        "outbox": clients.outbox.stats(),
+        "checkpoints": clients.checkpoints.stats(),
+        "prefetch": clients.speculator.stats(),
+        "resilience": resilience.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Per-stage latency histograms for Prometheus to scrape."""
+    return Response(content=tracing.TRACER.prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.delete("/sessions/{session_id}", status_code=204)
+async def end_session(session_id: str):
+    if app.state.runner.end(session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8000)
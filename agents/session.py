@@ -0,0 +1,211 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import audio
+import tracing
+
+# Threads for blocking SDK calls (Groq, Gemini, Postgres, TTS) across all sessions
+MAX_WORKERS = int(os.getenv("SESSION_WORKERS", "32"))
+IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "900"))
+
+
+class Listen(NamedTuple):
+    """Yielded by a flow when it needs the caller's next answer."""
+
+    max_seconds: float = audio.MAX_SECONDS
+    name: str = "audio.wav"
+
+
+def flow_name(flow) -> str:
+    """The flow's module name ("lab"), also when lab.py is run as a script."""
+    module = getattr(flow, "__module__", "flow")
+    if module == "__main__":
+        path = getattr(sys.modules["__main__"], "__file__", None) or module
+        module = os.path.splitext(os.path.basename(path))[0]
+    return module
+
+
+class Session:
+    """One caller's run through a flow.
+
+    A flow is a generator function taking the session: it speaks with
+    `session.say(...)`, keeps what it has learned in `session.slots` and gets
+    each answer back from `yield Listen(...)`. Whoever drives the session (the
+    microphone loop or the service's SessionRunner) decides where the answer
+    comes from. Nothing here is module-global, so any number of sessions can
+    be in flight at once.
+    """
+
+    def __init__(self, flow, clients, speak=None, session_id: str = None):
+        self.id = session_id or uuid.uuid4().hex
+        self.flow_name = flow_name(flow)
+        self.clients = clients
+        self.slots: Dict[str, object] = {}
+        self.audio: Dict[str, object] = {}  # utterance name -> captured PCM / upload
+        self.messages: List[str] = []
+        self.prompt: Optional[Listen] = None
+        self.done = False
+        self.closing = False
+        self.last_active = time.monotonic()
+
+        self._speak = speak
+        self._speech = None
+        self._dialogue = flow(self)
+        self._lock = threading.Lock()
+
+    def say(self, text: str) -> None:
+        """Queue `text` for the caller and return without waiting for playback."""
+        print(text)
+        self.messages.append(text)
+        if self._speak is not None:
+            self._speech = self._speak(text)
+
+    def wait_for_speech(self) -> None:
+        """Block until everything said so far has played; call before listening."""
+        if self._speech is not None:
+            self._speech.result()
+            self._speech = None
+
+    def audio_name(self) -> str:
+        # Per-session names so concurrent debug dumps never overwrite each other
+        name = self.prompt.name if self.prompt else "audio.wav"
+        return f"{self.id}-{name}"
+
+    def advance(self, answer: str = None) -> List[str]:
+        """Run the flow up to its next question; returns what it said meanwhile."""
+        try:
+            with self._lock, tracing.context(self.id, self.flow_name), tracing.span("turn"):
+                self.last_active = time.monotonic()
+                if self.done or self.closing:
+                    return []
+                start = len(self.messages)
+                try:
+                    if self.prompt is None:
+                        self.prompt = next(self._dialogue)
+                    else:
+                        self.prompt = self._dialogue.send(answer or "")
+                except StopIteration:
+                    self.prompt = None
+                    self.done = True
+                return self.messages[start:]
+        finally:
+            # A close() that arrived mid-turn is finished here, once the lock is free
+            self._close_if_idle()
+
+    def close(self) -> None:
+        """End the session without waiting: a turn still running closes it when it's done."""
+        self.closing = True
+        self._close_if_idle()
+
+    def _close_if_idle(self) -> None:
+        if self.closing and self._lock.acquire(blocking=False):
+            try:
+                self._dialogue.close()
+                self.done = True
+                self.audio.clear()
+            finally:
+                self._lock.release()
+
+
+class SessionRunner:
+    """Drives many sessions from one asyncio loop.
+
+    Sessions waiting for their caller cost nothing but memory; only a turn
+    that is actually running holds a worker thread, and at most
+    `max_workers` blocking SDK calls run at once.
+    """
+
+    def __init__(self, clients, max_workers: int = MAX_WORKERS, idle_seconds: float = IDLE_SECONDS):
+        self.clients = clients
+        self.idle_seconds = idle_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="session")
+        self.sessions: Dict[str, Session] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def run_blocking(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        # Executor threads don't inherit contextvars; carry the session's trace context over
+        return await loop.run_in_executor(self.executor, tracing.bind(fn), *args)
+
+    async def start(self, flow, session_id: str = None) -> Tuple[Session, List[str]]:
+        """Start a session; pass the ID of an abandoned one to resume it."""
+        if session_id in self.sessions:
+            # The caller reconnected before the old session was reaped
+            self.end(session_id)
+        session = Session(flow, self.clients, session_id=session_id)
+        self.sessions[session.id] = session
+        self._locks[session.id] = asyncio.Lock()
+        return session, await self._advance(session, None)
+
+    async def turn(self, session_id: str, text: str = None, upload: Tuple[str, bytes] = None) -> Tuple[Session, List[str]]:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+
+        # One turn at a time per session; other sessions are unaffected
+        async with self._locks[session_id]:
+            if text is None and upload is not None:
+                name, data = upload
+                session.audio[session.audio_name()] = data
+                with tracing.context(session.id, session.flow_name):
+                    text = await self.run_blocking(audio.transcribe_upload, self.clients.groq, name, data)
+            return session, await self._advance(session, text)
+
+    async def _advance(self, session: Session, text: Optional[str]) -> List[str]:
+        messages = await self.run_blocking(session.advance, text)
+        if session.done:
+            self.end(session.id)
+        return messages
+
+    def end(self, session_id: str) -> Optional[Session]:
+        # Safe on the event loop: never waits for a turn that is still running
+        session = self.sessions.pop(session_id, None)
+        self._locks.pop(session_id, None)
+        if session is not None:
+            session.close()
+        return session
+
+    def reap(self) -> int:
+        """End sessions whose caller has gone quiet for `idle_seconds`."""
+        cutoff = time.monotonic() - self.idle_seconds
+        stale = [sid for sid, s in self.sessions.items() if s.last_active < cutoff]
+        for session_id in stale:
+            self.end(session_id)
+        return len(stale)
+
+    def shutdown(self) -> None:
+        for session_id in list(self.sessions):
+            self.end(session_id)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_local(flow, clients, session_id: str = None) -> Session:
+    """Drive a flow from the microphone and speakers until it finishes."""
+    session = Session(flow, clients, speak=clients.speak, session_id=session_id)
+    print(f"Session {session.id}")
+    session.advance()
+
+    # One open microphone for the whole session
+    with audio.Microphone() as mic, tracing.context(session.id, session.flow_name):
+        while not session.done:
+            # Whatever the flow did since its last question overlapped the speech
+            session.wait_for_speech()
+            print("Listening...")
+            frames = mic.listen(max_seconds=session.prompt.max_seconds)
+            print("Finished Listening.")
+
+            name = session.audio_name()
+            # A copy: the slice itself is overwritten once the microphone's ring wraps
+            session.audio[name] = bytes(frames)
+            answer = audio.transcribe(clients.groq, frames, name)
+            print("Audio: ", answer)
+            session.advance(answer)
+
+    session.wait_for_speech()
+    return session
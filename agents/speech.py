@@ -0,0 +1,234 @@
+import hashlib
+import os
+import queue
+import shutil
+import threading
+import wave
+from concurrent.futures import Future
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+import pyttsx3
+
+import tracing
+
+RATE = 180  # Speed of speech (words per minute)
+VOLUME = 1.0  # Volume level (0.0 to 1.0)
+
+PHRASE_DIR = os.getenv("PHRASE_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrases")
+
+
+class Clip(NamedTuple):
+    """A rendered phrase: its WAV file and the PCM inside it."""
+
+    path: str
+    channels: int
+    sample_width: int
+    rate: int
+    frames: bytes
+
+
+class PhraseCache:
+    """Fixed prompts rendered to WAV once and replayed from PCM.
+
+    `phrases` are spoken exactly as registered. `prefixes` are the fixed
+    start of a templated prompt ("Alright, here are the details of ..."):
+    the prefix is replayed and only the variable tail is synthesised live.
+    Files are keyed by text, voice, rate and volume, so changing any engine
+    setting renders fresh audio instead of replaying stale clips.
+    """
+
+    def __init__(self, directory: str = PHRASE_DIR):
+        self.directory = directory
+        self.phrases = set()
+        self.prefixes: Tuple[str, ...] = ()
+        self._clips: Dict[str, Clip] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def add(self, phrases: Iterable[str] = (), prefixes: Iterable[str] = ()) -> None:
+        self.phrases.update(phrases)
+        # Longest first, so the most specific template wins
+        self.prefixes = tuple(sorted(set(self.prefixes) | set(prefixes), key=len, reverse=True))
+
+    def split(self, text: str) -> Optional[Tuple[str, str]]:
+        """(cached part, live part) of `text`, or None if nothing is cached."""
+        if text in self.phrases:
+            return text, ""
+        for prefix in self.prefixes:
+            if text.startswith(prefix):
+                return prefix, text[len(prefix):].strip()
+        return None
+
+    def path(self, text: str, voice: str, rate: int, volume: float) -> str:
+        key = hashlib.sha1(f"{voice}\0{rate}\0{volume}\0{text}".encode()).hexdigest()
+        return os.path.join(self.directory, key + ".wav")
+
+    def get(self, path: str) -> Optional[Clip]:
+        clip = self._clips.get(path)
+        if clip is None and os.path.exists(path):
+            try:
+                with wave.open(path, "rb") as wf:
+                    clip = Clip(path, wf.getnchannels(), wf.getsampwidth(), wf.getframerate(), wf.readframes(wf.getnframes()))
+            except (wave.Error, EOFError):
+                # Not a WAV (some drivers write AIFF); fall back to live speech
+                return None
+            self._clips[path] = clip
+        return clip
+
+
+class Speaker:
+    """Plays and renders speech on one dedicated thread.
+
+    `say()` queues an utterance and returns a Future straight away, so the
+    caller can start its next Gemini, database or Zoom call while the words
+    are still playing. Call `wait()` before opening the microphone. pyttsx3
+    engines are not thread-safe, so the engine is created and driven only
+    by the worker thread.
+    """
+
+    def __init__(self, rate: int = RATE, volume: float = VOLUME, phrases: PhraseCache = None):
+        self.rate = rate
+        self.volume = volume
+        self.voice = None
+        self.phrases = phrases or PhraseCache()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._last: Optional[Future] = None
+        self._lock = threading.Lock()
+        self._audio = None
+        self._streams = {}
+
+        self._started = Future()
+        self._thread = threading.Thread(target=self._run, name="speaker", daemon=True)
+        self._thread.start()
+        # Surface engine init errors (no audio driver, etc.) in the caller
+        self._started.result()
+
+    def _run(self) -> None:
+        try:
+            # Initialize the engine
+            engine = pyttsx3.init()
+            engine.setProperty("rate", self.rate)
+            engine.setProperty("volume", self.volume)
+            self.voice = engine.getProperty("voice")
+        except Exception as e:
+            self._started.set_exception(e)
+            return
+        self._started.set_result(None)
+
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            future, action, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(action(engine, *args))
+            except Exception as e:
+                future.set_exception(e)
+
+        for stream in self._streams.values():
+            stream.close()
+        if self._audio is not None:
+            self._audio.terminate()
+
+    def _submit(self, action, *args) -> Future:
+        future = Future()
+        with self._lock:
+            # Spans on the speaker thread still belong to the session that queued the job
+            self._queue.put((future, tracing.bind(action), args))
+            self._last = future
+        return future
+
+    # Everything below prefixed with _do runs on the speaker thread
+
+    def _do_say(self, engine, text: str) -> None:
+        with tracing.span("tts", chars=len(text)) as span:
+            split = self.phrases.split(text)
+            if split is not None:
+                clip = self._clip(engine, split[0])
+                if clip is not None:
+                    self._play(clip)
+                    span.bytes = len(clip.frames)
+                    text = split[1]
+            span.attrs["spoken_chars"] = len(text)
+            if text:
+                engine.say(text)
+                engine.runAndWait()
+
+    def _do_render(self, engine, text: str, path: str) -> str:
+        with tracing.span("synthesize", chars=len(text)) as span:
+            clip = self._clip(engine, text) if text in self.phrases.phrases else None
+            if clip is not None:
+                shutil.copyfile(clip.path, path)
+            else:
+                engine.save_to_file(text, path)
+                engine.runAndWait()
+            span.bytes = os.path.getsize(path)
+        return path
+
+    def _do_prerender(self, engine, texts: Tuple[str, ...]) -> int:
+        return sum(self._clip(engine, text) is not None for text in texts)
+
+    def _do_configure(self, engine, settings: dict) -> None:
+        for name, value in settings.items():
+            engine.setProperty(name, value)
+        self.rate = engine.getProperty("rate")
+        self.volume = engine.getProperty("volume")
+        self.voice = engine.getProperty("voice")
+
+    def _clip(self, engine, text: str) -> Optional[Clip]:
+        path = self.phrases.path(text, self.voice, self.rate, self.volume)
+        clip = self.phrases.get(path)
+        if clip is None and not os.path.exists(path):
+            partial = path + ".part.wav"
+            engine.save_to_file(text, partial)
+            engine.runAndWait()
+            os.replace(partial, path)
+            clip = self.phrases.get(path)
+        return clip
+
+    def _play(self, clip: Clip) -> None:
+        spec = (clip.channels, clip.sample_width, clip.rate)
+        stream = self._streams.get(spec)
+        if stream is None:
+            if self._audio is None:
+                # PortAudio is only needed once something is actually played
+                import pyaudio
+
+                self._audio = pyaudio.PyAudio()
+            stream = self._streams[spec] = self._audio.open(
+                format=self._audio.get_format_from_width(clip.sample_width),
+                channels=clip.channels,
+                rate=clip.rate,
+                output=True,
+            )
+        stream.write(clip.frames)
+
+    def say(self, text: str) -> Future:
+        """Queue `text` for playback; resolves once it has been spoken."""
+        return self._submit(self._do_say, text)
+
+    def render(self, text: str, path: str) -> Future:
+        """Queue `text` to be written to `path` as WAV; resolves to `path`."""
+        return self._submit(self._do_render, text, path)
+
+    def prerender(self, phrases: Iterable[str] = (), prefixes: Iterable[str] = ()) -> Future:
+        """Register fixed prompts and render any not yet on disk."""
+        phrases, prefixes = tuple(phrases), tuple(prefixes)
+        self.phrases.add(phrases, prefixes)
+        return self._submit(self._do_prerender, phrases + prefixes)
+
+    def configure(self, **settings) -> Future:
+        """engine.setProperty(...) for each setting, in queue order."""
+        return self._submit(self._do_configure, settings)
+
+    def wait(self, timeout: float = None) -> None:
+        """Block until everything queued so far has been spoken."""
+        with self._lock:
+            last = self._last
+        if last is not None and not last.cancelled():
+            last.exception(timeout)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
@@ -0,0 +1,76 @@
+"""Import-time report for the agent scripts.
+
+Imports each module in a fresh interpreter under `python -X importtime`
+and reports how long it took, the slowest packages, and which heavy SDKs
+were loaded before a caller said anything. Clients are built on first use
+(see clients.py), so a module should only pull in what its first turn needs.
+
+    python startup.py lab doctor doubts
+    python startup.py service --top 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import NamedTuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Loaded on demand by Clients and the flows; none should appear at import
+HEAVY = ("phi", "google.generativeai", "groq", "pyttsx3", "pyaudio", "psycopg2", "zoom", "outbox", "smtplib", "requests")
+BUDGET = 1.0  # seconds
+
+
+class Report(NamedTuple):
+    module: str
+    seconds: float
+    modules: int
+    heavy: list
+    packages: list  # (package, self seconds), slowest first
+
+
+def measure(module: str) -> Report:
+    code = f"import sys, time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t); print(' '.join(sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=HERE)
+    if proc.returncode:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    seconds, loaded = proc.stdout.splitlines()[-2:]
+    loaded = set(loaded.split())
+
+    # "import time:  self [us] | cumulative | imported package", one line per module
+    packages = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us)
+
+    return Report(
+        module,
+        float(seconds),
+        len(loaded),
+        [name for name in HEAVY if name in loaded],
+        sorted(((name, us / 1e6) for name, us in packages.items()), key=lambda p: -p[1]),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("modules", nargs="*", default=["lab", "doctor", "doubts"])
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    args = parser.parse_args()
+
+    over = False
+    for module in args.modules:
+        report = measure(module)
+        over |= report.seconds > BUDGET
+        print(f"{module}: {report.seconds:.3f}s, {report.modules} modules")
+        print(f"  heavy SDKs loaded: {', '.join(report.heavy) or 'none'}")
+        for name, seconds in report.packages[: args.top]:
+            print(f"  {name:<28} {seconds * 1000:8.1f} ms")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
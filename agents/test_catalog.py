@@ -0,0 +1,33 @@
+import pytest
+
+from catalog import ALIASES, LabTestCatalog
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return LabTestCatalog(list(ALIASES))
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("I want to book a blood sugar test", "Blood Sugar Test"),
+    ("vitamin d test", "Vitamin D Test"),
+    ("CBC please", "Complete Blood Count Test"),
+    ("lipid profil", "Lipid Profile Test"),
+    ("complete blod count", "Complete Blood Count Test"),
+    ("liver functon", "Liver Function Test"),
+])
+def test_offered_tests_match_despite_mishearing(catalog, query, expected):
+    match = catalog.match(query)
+    assert match.ok
+    assert match.name == expected
+
+
+@pytest.mark.parametrize("query", [
+    "vitamin b12 test",
+    "vitamin b 12",
+    "vitamin c",
+    "kidney function test",
+    "urine test",
+])
+def test_tests_not_on_offer_do_not_match(catalog, query):
+    assert not catalog.match(query).ok
@@ -0,0 +1,157 @@
+from datetime import date, time
+
+import pytest
+
+import parsing
+from parsing import CONFIDENCE_THRESHOLD, parse_date, parse_name, parse_time
+
+TODAY = date(2026, 3, 10)  # a Tuesday
+
+
+class Reply:
+    def __init__(self, text):
+        self.text = text
+
+
+class ScriptedModel:
+    """Answers every prompt with `text` and remembers what it was asked."""
+
+    def __init__(self, text):
+        self.text = text
+        self.prompts = []
+
+    def generate_content(self, prompt, kind=None, **kwargs):
+        self.prompts.append(prompt)
+        return Reply(self.text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("My name is Priya", "Priya"),
+    ("my name is priya sharma", "Priya Sharma"),
+    ("Call me Abraham please", "Abraham"),
+    ("my name is Priya and I need a test", "Priya"),
+])
+def test_stated_names_are_confident(text, expected):
+    parsed = parse_name(text)
+    assert parsed.value == expected
+    assert parsed.confidence >= CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("text", [
+    "I am looking for a doctor",
+    "it is raining",
+    "Hello, this is Priya speaking",
+    "I am fine",
+    "Abraham",
+])
+def test_everything_else_is_left_to_the_model(text):
+    assert parse_name(text).confidence < CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I am looking for a doctor", None),
+    ("I am fine", None),
+    ("Hello, this is Priya speaking", "Priya"),
+])
+def test_name_words_stop_at_the_first_non_name(text, expected):
+    assert parse_name(text).value == expected
+
+
+def test_unsure_names_go_to_the_model():
+    model = ScriptedModel("Priya")
+    parsed = parsing.name(model, "Hello, this is Priya speaking")
+    assert parsed == ("Priya", "llm", 1.0)
+    assert len(model.prompts) == 1
+
+
+def test_confident_names_skip_the_model():
+    model = ScriptedModel("unused")
+    assert parsing.name(model, "My name is Priya").value == "Priya"
+    assert model.prompts == []
+
+
+@pytest.mark.parametrize("reply, expected", [("Yes.", True), ("No", False), ("Unclear", None), ("Maybe", None)])
+def test_confirm_keeps_unclear_replies_unset(reply, expected):
+    assert parsing.confirm(ScriptedModel(reply), "hmm let me see").value is expected
+
+
+def test_confirm_asks_again_on_silence():
+    model = ScriptedModel("No")
+    assert parsing.confirm(model, "  ").value is None
+    assert model.prompts == []
+
+
+@pytest.mark.parametrize("reply", ["There is no name.", "I'm sorry, I can't tell", "None"])
+def test_model_replies_that_are_not_names_are_rejected(reply):
+    assert parsing.name(ScriptedModel(reply), "uh well hmm so").value is None
+
+
+def test_blank_answers_never_reach_the_model():
+    model = ScriptedModel("Priya")
+    assert parsing.name(model, " ").value is None
+    day, hour = parsing.booking_parts(model, "")
+    assert (day.value, hour.value) == (None, None)
+    assert model.prompts == []
+
+
+@pytest.mark.parametrize("text, expected, confident", [
+    ("26 March", date(2026, 3, 26), True),
+    ("twenty sixth of march", date(2026, 3, 26), True),
+    ("March 26th please", date(2026, 3, 26), True),
+    ("5 January", date(2027, 1, 5), True),        # already past this year
+    ("12/04", date(2026, 4, 12), False),          # could be either order
+    ("tomorrow", date(2026, 3, 11), True),
+    ("day after tomorrow", date(2026, 3, 12), True),
+    ("on friday", date(2026, 3, 13), True),
+    ("tuesday", date(2026, 3, 17), True),         # next week, not today
+    ("sometime next month", None, False),
+])
+def test_parse_date(text, expected, confident):
+    parsed = parse_date(text, today=TODAY)
+    assert parsed.value == expected
+    assert (parsed.confidence >= CONFIDENCE_THRESHOLD) is confident
+
+
+@pytest.mark.parametrize("text, expected, confident", [
+    ("8 AM", time(8, 0), True),
+    ("8:30 p.m.", time(20, 30), True),
+    ("noon", time(12, 0), True),
+    ("14:45", time(14, 45), True),
+    ("eight o clock in the evening", time(20, 0), True),
+    ("7 o'clock", time(7, 0), False),             # morning or evening?
+    ("around lunch", None, False),
+])
+def test_parse_time(text, expected, confident):
+    parsed = parse_time(text)
+    assert parsed.value == expected
+    assert (parsed.confidence >= CONFIDENCE_THRESHOLD) is confident
+
+
+def test_confident_booking_parts_skip_the_model():
+    model = ScriptedModel("unused")
+    day, hour = parsing.booking_parts(model, "26 March 8 AM")
+    assert ((day.value.month, day.value.day), hour.value) == ((3, 26), time(8, 0))
+    assert (day.source, hour.source) == ("local", "local")
+    assert model.prompts == []
+
+
+def test_unsure_booking_parts_fall_back_to_the_model():
+    model = ScriptedModel('{"date": "March 26", "time": "1 PM"}')
+    day, hour = parsing.booking_parts(model, "around lunch on the twenty sixth")
+    assert ((day.value.month, day.value.day), hour.value) == ((3, 26), time(13, 0))
+    assert (day.source, hour.source) == ("llm", "llm")
+    assert len(model.prompts) == 1
+
+
+def test_booking_parts_keep_what_was_heard_locally():
+    # The date is clear; only the time has to come from the model
+    model = ScriptedModel('{"date": null, "time": "1 PM"}')
+    day, hour = parsing.booking_parts(model, "26 March around lunch")
+    assert (day.source, hour.source) == ("local", "llm")
+    assert hour.value == time(13, 0)
+
+
+def test_booking_parts_leave_missing_parts_unset():
+    model = ScriptedModel('{"date": null, "time": null}')
+    day, hour = parsing.booking_parts(model, "whenever suits the doctor")
+    assert (day.value, hour.value) == (None, None)
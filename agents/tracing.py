@@ -0,0 +1,194 @@
+import bisect
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+TRACE_PATH = os.getenv("TRACE_PATH")  # JSONL span log; unset to keep histograms only
+TRACE_SAMPLE = float(os.getenv("TRACE_SAMPLE", "1.0"))  # fraction of sessions written to TRACE_PATH
+TRACE_QUEUE = 10000  # spans waiting for the writer; more are dropped, never waited on
+# Seconds; covers a cached phrase (ms) up to a slow agent run with web search
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_session = contextvars.ContextVar("trace_session", default=(None, None, False))
+
+
+@contextmanager
+def context(session_id: str, flow: str):
+    """Tag spans started in this context (and copies of it) with the session."""
+    sampled = random.Random(session_id).random() < TRACE_SAMPLE
+    token = _session.set((session_id, flow, sampled))
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def bind(fn):
+    """`fn` wrapped to run in a copy of the caller's context, e.g. on a worker thread.
+
+    Bind once per call: the same copy can't be entered by two threads at once.
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+class Span:
+    """One timed stage or external call. Set bytes/tokens/attempt/attrs inside the block."""
+
+    __slots__ = ("tracer", "stage", "attempt", "bytes", "tokens", "attrs", "started", "_start")
+
+    def __init__(self, tracer: "Tracer", stage: str, attempt: int = 1, bytes: int = 0, tokens: int = 0, **attrs):
+        self.tracer = tracer
+        self.stage = stage
+        self.attempt = attempt
+        self.bytes = bytes
+        self.tokens = tokens
+        self.attrs = attrs
+
+    def __enter__(self) -> "Span":
+        self.started = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        error = exc_type.__name__ if exc_type is not None and issubclass(exc_type, Exception) else None
+        self.tracer.record(self, time.perf_counter() - self._start, error)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "errors", "bytes", "tokens")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.errors = 0
+        self.bytes = 0
+        self.tokens = 0
+
+
+class Tracer:
+    """Per-stage latency histograms, plus an optional JSONL log of every span.
+
+    Recording a span is a couple of clock reads and counter updates under a
+    lock; JSON encoding and file writes happen on a background thread, and
+    spans are dropped rather than waited on if it falls behind. The session
+    ID and flow come from `context()`, so call sites only name the stage.
+    """
+
+    def __init__(self, path: Optional[str] = TRACE_PATH):
+        self.path = path
+        self.dropped = 0
+        self._histograms: Dict[Tuple[str, str], _Histogram] = {}
+        self._lock = threading.Lock()
+        self._queue: Optional["queue.Queue"] = None
+        self._thread = None
+        if path:
+            self._queue = queue.Queue(maxsize=TRACE_QUEUE)
+            self._thread = threading.Thread(target=self._write, name="tracing", daemon=True)
+            self._thread.start()
+
+    def span(self, stage: str, **fields) -> Span:
+        return Span(self, stage, **fields)
+
+    def record(self, span: Span, seconds: float, error: Optional[str] = None) -> None:
+        session_id, flow, sampled = _session.get()
+        key = (span.stage, flow or "")
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram.sum += seconds
+            histogram.bytes += span.bytes
+            histogram.tokens += span.tokens
+            if error:
+                histogram.errors += 1
+
+        writer = self._queue
+        if writer is not None and (sampled or session_id is None):
+            entry = {
+                "time": round(span.started, 6),
+                "session": session_id,
+                "flow": flow,
+                "stage": span.stage,
+                "seconds": round(seconds, 6),
+                "attempt": span.attempt,
+                "bytes": span.bytes,
+                "tokens": span.tokens,
+                "error": error,
+                **span.attrs,
+            }
+            try:
+                writer.put_nowait(entry)
+            except queue.Full:
+                self.dropped += 1
+
+    def _write(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            writer = self._queue
+            while True:
+                entry = writer.get()
+                if entry is None:
+                    break
+                f.write(json.dumps(entry, default=str) + "\n")
+                # Flush once the backlog is written, not per line
+                if writer.empty():
+                    f.flush()
+
+    def prometheus(self) -> str:
+        """Histograms and counters in the Prometheus text exposition format."""
+        with self._lock:
+            snapshot = [(key, list(h.counts), h.sum, h.errors, h.bytes, h.tokens) for key, h in sorted(self._histograms.items())]
+
+        lines = [
+            "# HELP medicare_stage_seconds Time spent per pipeline stage or external call.",
+            "# TYPE medicare_stage_seconds histogram",
+        ]
+        for (stage, flow), counts, total, _, _, _ in snapshot:
+            labels = f'stage="{stage}",flow="{flow}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, counts):
+                cumulative += count
+                lines.append(f'medicare_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'medicare_stage_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"medicare_stage_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"medicare_stage_seconds_count{{{labels}}} {cumulative}")
+
+        for name, index, help_text in (
+            ("medicare_stage_errors_total", 3, "Stage calls that raised."),
+            ("medicare_stage_payload_bytes_total", 4, "Bytes sent to or received from external services."),
+            ("medicare_stage_tokens_total", 5, "LLM tokens used."),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for row in snapshot:
+                (stage, flow), value = row[0], row[index]
+                lines.append(f'{name}{{stage="{stage}",flow="{flow}"}} {value}')
+
+        lines += [
+            "# HELP medicare_trace_dropped_total Spans not written to the trace file because the writer fell behind.",
+            "# TYPE medicare_trace_dropped_total counter",
+            f"medicare_trace_dropped_total {self.dropped}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def close(self, timeout: float = 5) -> None:
+        """Stop writing the trace file once what is queued has been written."""
+        writer, self._queue = self._queue, None
+        if writer is not None:
+            writer.put(None)
+            self._thread.join(timeout)
+
+
+TRACER = Tracer()
+
+
+def span(stage: str, **fields) -> Span:
+    """`with tracing.span("zoom", attempt=2) as s: ...; s.bytes = len(body)`"""
+    return TRACER.span(stage, **fields)
@@ -0,0 +1,193 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import tracing
+
+API_URL = os.getenv("ZOOM_API_URL") or "https://api.zoom.us/v2"
+OAUTH_URL = os.getenv("ZOOM_OAUTH_URL") or "https://zoom.us/oauth/token"
+# Shared by every process on the host, so a restart doesn't cost an OAuth exchange
+TOKEN_CACHE = os.getenv("ZOOM_TOKEN_CACHE") or os.path.join(tempfile.gettempdir(), "medicare-zoom-token.json")
+TIMEOUT = float(os.getenv("ZOOM_TIMEOUT", "10"))
+POOL_SIZE = int(os.getenv("ZOOM_POOL_SIZE", "10"))
+EXPIRY_MARGIN = 60  # seconds; refresh a little before Zoom says the token expires
+
+
+class ZoomError(RuntimeError):
+    pass
+
+
+class Meeting(NamedTuple):
+    meeting_id: str
+    meeting_url: str
+    topic: str
+    start_time: str
+    duration: int
+
+
+class TokenCache:
+    """OAuth access tokens in a small JSON file, keyed by account and client."""
+
+    def __init__(self, path: str = TOKEN_CACHE):
+        self.path = path
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """(token, expires_at) if an unexpired token is cached."""
+        try:
+            with open(self.path) as f:
+                entry = json.load(f).get(key)
+        except (OSError, ValueError):
+            return None
+        if entry and entry.get("expires_at", 0) > time.time():
+            return entry["access_token"], entry["expires_at"]
+        return None
+
+    def put(self, key: str, token: str, expires_at: float) -> None:
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        now = time.time()
+        entries = {k: v for k, v in entries.items() if v.get("expires_at", 0) > now}
+        entries[key] = {"access_token": token, "expires_at": expires_at}
+
+        # Write-then-rename so readers in other processes never see half a file
+        fd, partial = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".part")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.chmod(partial, 0o600)
+        os.replace(partial, self.path)
+
+    def delete(self, key: str) -> None:
+        self.put(key, "", 0)
+
+
+class ZoomClient:
+    """Server-to-server OAuth Zoom client for scheduling consultations.
+
+    One instance is shared by every session: requests go out over a pooled
+    requests.Session and the access token is reused, in memory and through
+    the on-disk TokenCache, until shortly before it expires. Point `api_url`
+    and `oauth_url` at a local stub server to exercise it offline.
+    """
+
+    def __init__(
+        self,
+        account_id: str = None,
+        client_id: str = None,
+        client_secret: str = None,
+        api_url: str = API_URL,
+        oauth_url: str = OAUTH_URL,
+        token_cache: TokenCache = None,
+        timeout: float = TIMEOUT,
+    ):
+        self.account_id = account_id or os.getenv("ZOOM_ACCOUNT_ID")
+        self.client_id = client_id or os.getenv("ZOOM_CLIENT_ID")
+        self.client_secret = client_secret or os.getenv("ZOOM_CLIENT_SECRET")
+        self.api_url = api_url.rstrip("/")
+        self.oauth_url = oauth_url
+        self.token_cache = token_cache or TokenCache()
+        self.timeout = timeout
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE)
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+
+        self._token = None
+        self._token_expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def _cache_key(self) -> str:
+        return f"{self.account_id}:{self.client_id}"
+
+    def access_token(self) -> str:
+        with self._lock:
+            if self._token and time.time() < self._token_expires_at:
+                return self._token
+
+            cached = self.token_cache.get(self._cache_key)
+            if cached:
+                self._token, self._token_expires_at = cached
+                return self._token
+
+            if not (self.account_id and self.client_id and self.client_secret):
+                raise ZoomError("ZOOM_ACCOUNT_ID, ZOOM_CLIENT_ID and ZOOM_CLIENT_SECRET must be set")
+
+            try:
+                with tracing.span("zoom_token") as span:
+                    response = self.http.post(
+                        self.oauth_url,
+                        data={"grant_type": "account_credentials", "account_id": self.account_id},
+                        auth=(self.client_id, self.client_secret),
+                        timeout=self.timeout,
+                    )
+                    span.bytes = len(response.content)
+                    response.raise_for_status()
+                token_info = response.json()
+            except (requests.RequestException, ValueError) as e:
+                raise ZoomError(f"Error fetching access token: {e}") from e
+
+            self._token = token_info["access_token"]
+            self._token_expires_at = time.time() + token_info["expires_in"] - EXPIRY_MARGIN
+            self.token_cache.put(self._cache_key, self._token, self._token_expires_at)
+            return self._token
+
+    def invalidate_token(self) -> None:
+        with self._lock:
+            self._token, self._token_expires_at = None, 0.0
+            self.token_cache.delete(self._cache_key)
+
+    def create_meeting(self, topic: str, start: datetime, duration: int = 30) -> Meeting:
+        """Schedule a meeting; `start` must be timezone-aware."""
+        body = {
+            "topic": topic,
+            "type": 2,  # scheduled
+            "start_time": start.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration": duration,
+            "timezone": str(start.tzinfo),
+            "settings": {
+                "host_video": True,
+                "participant_video": True,
+                "join_before_host": False,
+                "mute_upon_entry": False,
+                "watermark": True,
+                "audio": "voip",
+                "auto_recording": "none",
+            },
+        }
+
+        for attempt in range(2):
+            headers = {"Authorization": f"Bearer {self.access_token()}"}
+            try:
+                with tracing.span("zoom", attempt=attempt + 1) as span:
+                    response = self.http.post(f"{self.api_url}/users/me/meetings", json=body, headers=headers, timeout=self.timeout)
+                    span.bytes = len(response.content)
+                    span.attrs["status"] = response.status_code
+            except requests.RequestException as e:
+                raise ZoomError(f"Error scheduling meeting: {e}") from e
+
+            # A token revoked or expired early: fetch a new one and try once more
+            if response.status_code == 401 and attempt == 0:
+                self.invalidate_token()
+                continue
+            break
+
+        try:
+            response.raise_for_status()
+            info = response.json()
+            return Meeting(str(info["id"]), info["join_url"], info.get("topic", topic), info.get("start_time", ""), info.get("duration", duration))
+        except (requests.RequestException, ValueError, KeyError) as e:
+            raise ZoomError(f"Error scheduling meeting: {e}") from e
+
+    def close(self) -> None:
+        self.http.close()